@@ -0,0 +1,196 @@
+# aggregate_cube.py
+import numpy as np
+import pandas as pd
+
+from amount_distribution import BinnedDistribution, bin_positions, log_bins
+
+# Dimensions of the cube, one cell per distinct combination present in the data
+CUBE_COLUMNS = ['State', 'Category', 'Eligibility_Caste', 'Eligibility_Gender',
+                'Course_Applicable', 'Batch']
+
+# Amount histogram bins shared by every cube, so cubes (e.g. of different
+# shards) merge; log-spaced, so the bins double as a quantile sketch with
+# 2% relative error. Amounts outside the edges fall in the first/last bin.
+AMOUNT_BIN_EDGES = log_bins(1000, 10000000, relative_accuracy=0.02)
+
+def _reduce(groups, n_groups, count, amount_sum, amount_min, amount_max):
+    """Sum/min/max the measures of the cells (or rows) sharing a group number"""
+    if n_groups == 0:
+        return np.zeros(0, np.int64), np.zeros(0), np.zeros(0), np.zeros(0)
+    order = np.argsort(groups, kind='stable')
+    starts = np.searchsorted(groups[order], np.arange(n_groups))
+    return (np.bincount(groups, count, n_groups).astype(np.int64),
+            np.bincount(groups, amount_sum, n_groups),
+            np.minimum.reduceat(amount_min[order], starts),
+            np.maximum.reduceat(amount_max[order], starts))
+
+class AggregateCube:
+    """Scholarship counts and amount statistics pre-aggregated by CUBE_COLUMNS
+
+    Every cell holds the row count, the sum, minimum and maximum amount,
+    and an amount histogram over AMOUNT_BIN_EDGES. Statistics and charts
+    for a filter on the cube's columns roll up the matching cells, so their
+    cost depends on the number of distinct combinations rather than on
+    the number of rows. Cubes over the same bins merge, so they can be
+    built per chunk or shard and combined.
+    """
+
+    def __init__(self, values, keys, count, amount_sum, amount_min, amount_max, hist,
+                 bin_edges=AMOUNT_BIN_EDGES):
+        self.values = values          # per dimension, the values its codes refer to
+        self.keys = keys              # (cells x dimensions) codes
+        self.count = count
+        self.amount_sum = amount_sum
+        self.amount_min = amount_min
+        self.amount_max = amount_max
+        self.hist = hist              # (cells x bins) counts
+        self.bin_edges = bin_edges
+
+    @classmethod
+    def from_frame(cls, df, bin_edges=AMOUNT_BIN_EDGES):
+        """Aggregate the rows of df in one vectorized pass"""
+        values = []
+        codes = []
+        for column in CUBE_COLUMNS:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                column_codes = df[column].cat.codes.to_numpy()
+                uniques = df[column].cat.categories
+            else:
+                column_codes, uniques = pd.factorize(df[column])
+            values.append(np.asarray(uniques))
+            codes.append(column_codes.astype(np.int64))
+
+        # One mixed-radix integer per row, then one cell per distinct integer
+        combined = np.zeros(len(df), dtype=np.int64)
+        for column_codes, column_values in zip(codes, values):
+            combined = combined * max(len(column_values), 1) + column_codes
+        cells, groups = np.unique(combined, return_inverse=True)
+        keys = np.empty((len(cells), len(CUBE_COLUMNS)), dtype=np.int32)
+        for dimension in range(len(CUBE_COLUMNS) - 1, -1, -1):
+            radix = max(len(values[dimension]), 1)
+            cells, keys[:, dimension] = np.divmod(cells, radix)
+
+        amounts = df['Amount'].to_numpy().astype(np.float64)
+        n_bins = len(bin_edges) - 1
+        hist = np.bincount(groups * n_bins + bin_positions(bin_edges, amounts),
+                           minlength=len(keys) * n_bins)
+        hist = hist.reshape(len(keys), n_bins).astype(np.int32)
+        count, amount_sum, amount_min, amount_max = _reduce(
+            groups, len(keys), np.ones(len(df)), amounts, amounts, amounts)
+        return cls(values, keys, count, amount_sum, amount_min, amount_max, hist, bin_edges)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def merge(self, other):
+        """Cube of the rows of both cubes, which must share bin edges"""
+        if not np.array_equal(self.bin_edges, other.bin_edges):
+            raise ValueError("Only cubes over the same amount bins can be merged")
+        values = []
+        keys = np.empty((len(self) + len(other), len(CUBE_COLUMNS)), dtype=np.int64)
+        for dimension in range(len(CUBE_COLUMNS)):
+            # Recode both cubes' codes against the union of their values
+            labels = np.concatenate([self.values[dimension][self.keys[:, dimension]],
+                                     other.values[dimension][other.keys[:, dimension]]])
+            keys[:, dimension], uniques = pd.factorize(labels, sort=True)
+            values.append(np.asarray(uniques))
+        cells, groups = np.unique(keys, axis=0, return_inverse=True)
+        groups = groups.ravel()
+        count, amount_sum, amount_min, amount_max = _reduce(
+            groups, len(cells), np.concatenate([self.count, other.count]),
+            np.concatenate([self.amount_sum, other.amount_sum]),
+            np.concatenate([self.amount_min, other.amount_min]),
+            np.concatenate([self.amount_max, other.amount_max]))
+        hist = np.zeros((len(cells), self.hist.shape[1]), dtype=np.int32)
+        np.add.at(hist, groups, np.concatenate([self.hist, other.hist]))
+        return AggregateCube(values, cells.astype(np.int32), count, amount_sum,
+                             amount_min, amount_max, hist, self.bin_edges)
+
+    def _subset(self, mask):
+        return AggregateCube(self.values, self.keys[mask], self.count[mask],
+                             self.amount_sum[mask], self.amount_min[mask],
+                             self.amount_max[mask], self.hist[mask], self.bin_edges)
+
+    def select(self, plan):
+        """Cube of the cells matching a compiled filter plan, or None
+
+        Membership tests on the cube's columns select whole cells. An Amount
+        range is answered when every remaining cell lies entirely inside or
+        outside it; any other predicate needs the rows, and gives None.
+        """
+        mask = np.ones(len(self.keys), dtype=bool)
+        ranges = []
+        for predicate in plan:
+            if predicate[0] == 'range' and predicate[2:] == (None, None):
+                continue
+            if predicate[0] == 'range' and predicate[1] == 'Amount':
+                ranges.append(predicate[2:])
+                continue
+            if predicate[0] != 'isin' or predicate[1] not in CUBE_COLUMNS:
+                return None
+            _, column, wanted, wildcard = predicate
+            dimension = CUBE_COLUMNS.index(column)
+            accepted = set(wanted) | {wildcard}
+            matches = np.array([value in accepted for value in self.values[dimension]],
+                               dtype=bool)
+            mask &= matches[self.keys[:, dimension]]
+
+        for low, high in ranges:
+            low = -np.inf if low is None else low
+            high = np.inf if high is None else high
+            inside = (self.amount_min >= low) & (self.amount_max <= high)
+            outside = (self.amount_max < low) | (self.amount_min > high)
+            if np.any(mask & ~inside & ~outside):
+                return None
+            mask &= inside
+        return self._subset(mask)
+
+    def rollup(self, columns):
+        """Count and amount sum/min/max per combination of some cube columns"""
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        dimensions = [CUBE_COLUMNS.index(column) for column in columns]
+        groups, uniques = np.unique(self.keys[:, dimensions], axis=0, return_inverse=True)
+        count, amount_sum, amount_min, amount_max = _reduce(
+            uniques.ravel(), len(groups), self.count, self.amount_sum,
+            self.amount_min, self.amount_max)
+        labels = [self.values[d][groups[:, i]] for i, d in enumerate(dimensions)]
+        if len(labels) == 1:
+            index = pd.Index(labels[0], name=columns[0])
+        else:
+            index = pd.MultiIndex.from_arrays(labels, names=columns)
+        return pd.DataFrame({'count': count, 'amount_sum': amount_sum,
+                             'amount_min': amount_min, 'amount_max': amount_max}, index=index)
+
+    def counts(self, column):
+        """Row counts per value of a cube column, largest first (like value_counts)"""
+        counts = self.rollup(column)['count']
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def crosstab(self, index, columns):
+        """Row counts for two cube columns (like pandas.crosstab)"""
+        return self.rollup([index, columns])['count'].unstack(fill_value=0).sort_index()
+
+    def distribution(self):
+        """BinnedDistribution of the amounts over every cell"""
+        if not self.count.sum():
+            return BinnedDistribution(self.bin_edges, self.hist.sum(axis=0))
+        return BinnedDistribution(self.bin_edges, self.hist.sum(axis=0),
+                                  self.amount_min.min(), self.amount_max.max(),
+                                  self.amount_sum.sum())
+
+    def distributions(self, column):
+        """BinnedDistribution of the amounts per value of a cube column"""
+        dimension = CUBE_COLUMNS.index(column)
+        return {value: self._subset(self.keys[:, dimension] == code).distribution()
+                for code, value in enumerate(self.values[dimension])
+                if np.any(self.keys[:, dimension] == code)}
+
+    def summary(self):
+        """Total count and amount range/mean over every cell"""
+        total = int(self.count.sum())
+        return {
+            'count': total,
+            'amount_min': self.amount_min.min() if total else None,
+            'amount_max': self.amount_max.max() if total else None,
+            'amount_mean': self.amount_sum.sum() / total if total else None,
+        }
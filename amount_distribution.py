@@ -0,0 +1,152 @@
+# amount_distribution.py
+import numpy as np
+
+def fixed_bins(width=10000, high=500000):
+    """Equal-width bin edges from 0 to high"""
+    return np.arange(0, high + width, width, dtype=np.float64)
+
+def log_bins(low=1000, high=10000000, relative_accuracy=0.02):
+    """Log-spaced bin edges from low to high
+
+    Consecutive edges grow by (1 + a) / (1 - a) for relative_accuracy a,
+    as in DDSketch: any quantile read from the bins is within a relative
+    error a of the exact value.
+    """
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+    n_bins = int(np.ceil(np.log(high / low) / np.log(gamma)))
+    return low * gamma ** np.arange(n_bins + 1)
+
+def bin_positions(edges, values):
+    """Bin of every value; values outside the edges go to the first/last bin"""
+    bins = np.searchsorted(edges, values, 'right') - 1
+    return np.clip(bins, 0, len(edges) - 2)
+
+class BinnedDistribution:
+    """Amounts summarised as counts over fixed bin edges
+
+    Distributions over the same edges merge by adding their counts, so
+    they can be built per chunk or per shard and combined. Quantiles, box
+    plot statistics and a kernel density estimate are all computed from
+    the bins, at a cost independent of the number of amounts.
+    """
+
+    def __init__(self, edges, counts, minimum=None, maximum=None, total=None):
+        self.edges = edges
+        self.counts = counts
+        self.minimum = minimum
+        self.maximum = maximum
+        self.total = total
+        # Log-spaced edges are handled in log space throughout
+        self.log = bool(edges[0] > 0 and np.allclose(np.diff(np.log(edges)),
+                                                     np.log(edges[1] / edges[0])))
+
+    @classmethod
+    def from_values(cls, values, edges):
+        """Distribution of an array of amounts"""
+        values = np.asarray(values, dtype=np.float64)
+        counts = np.bincount(bin_positions(edges, values), minlength=len(edges) - 1)
+        if len(values) == 0:
+            return cls(edges, counts)
+        return cls(edges, counts, values.min(), values.max(), values.sum())
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def merge(self, other):
+        """Distribution of the amounts of both"""
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Only distributions over the same bins can be merged")
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return other
+        return BinnedDistribution(self.edges, self.counts + other.counts,
+                                  min(self.minimum, other.minimum),
+                                  max(self.maximum, other.maximum),
+                                  self.total + other.total)
+
+    def coarsen(self, max_bins=30):
+        """Distribution over runs of adjacent bins, at most max_bins spanning the occupied bins
+
+        The fine bins keep quantiles accurate but draw as spikes; a
+        histogram is drawn from these wider bins instead.
+        """
+        used = np.flatnonzero(self.counts)
+        if len(used) == 0:
+            return self
+        first, span = used[0], used[-1] + 1 - used[0]
+        group = -(-span // max_bins)
+        n_bins = -(-span // group)
+        counts = np.zeros(n_bins * group, dtype=self.counts.dtype)
+        counts[:span] = self.counts[first:first + span]
+        low = self._scale(self.edges[first])
+        edges = self._unscale(low + self.step * group * np.arange(n_bins + 1))
+        coarse = BinnedDistribution(edges, counts.reshape(n_bins, group).sum(axis=1),
+                                    self.minimum, self.maximum, self.total)
+        coarse.log = self.log
+        return coarse
+
+    def _scale(self, values):
+        return np.log(values) if self.log else values
+
+    def _unscale(self, values):
+        return np.exp(values) if self.log else values
+
+    @property
+    def step(self):
+        """Width of a bin (in log space for log-spaced bins)"""
+        return float(np.diff(self._scale(self.edges[:2]))[0])
+
+    def quantile(self, q):
+        """Approximate q-quantile, interpolated within its bin"""
+        n = self.count
+        if n == 0:
+            return None
+        cumulative = np.cumsum(self.counts)
+        rank = q * n
+        i = min(int(np.searchsorted(cumulative, rank, 'left')), len(self.counts) - 1)
+        below = cumulative[i] - self.counts[i]
+        fraction = (rank - below) / self.counts[i] if self.counts[i] else 0.0
+        low, high = self._scale(self.edges[i:i + 2])
+        value = float(self._unscale(low + fraction * (high - low)))
+        return min(max(value, self.minimum), self.maximum)
+
+    def box_stats(self, label=None, whis=1.5):
+        """Box plot statistics in the form matplotlib's Axes.bxp takes
+
+        Whiskers reach the most extreme amount within whis * IQR of the
+        quartiles, approximated from the bins; individual outliers are
+        not kept, so no fliers are drawn.
+        """
+        q1, median, q3 = (self.quantile(q) for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        return {
+            'label': label,
+            'q1': q1, 'med': median, 'q3': q3,
+            'whislo': max(self.minimum, q1 - whis * iqr),
+            'whishi': min(self.maximum, q3 + whis * iqr),
+            'mean': self.total / self.count,
+            'fliers': [],
+        }
+
+    def kde(self, points=200):
+        """(amounts, density) of a Gaussian KDE over the bin centres
+
+        Each bin contributes its count at its centre, with Silverman's
+        bandwidth (never narrower than one bin). The density is per unit
+        of the bin scale, i.e. of log-amount for log-spaced bins, so
+        density * count * step gives the expected count per bin.
+        """
+        used = np.flatnonzero(self.counts)
+        centres = self._scale(self.edges[used]) + self.step / 2
+        weights = self.counts[used]
+        n = weights.sum()
+        mean = np.dot(weights, centres) / n
+        std = np.sqrt(np.dot(weights, (centres - mean) ** 2) / n)
+        bandwidth = max(1.06 * std * n ** -0.2, self.step)
+
+        grid = np.linspace(*self._scale(np.array([self.minimum, self.maximum])), points)
+        z = (grid[None, :] - centres[:, None]) / bandwidth
+        density = np.dot(weights, np.exp(-0.5 * z ** 2)) / (n * bandwidth * np.sqrt(2 * np.pi))
+        return self._unscale(grid), density
@@ -0,0 +1,136 @@
+# ann_index.py
+import copy
+import time
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+class IVFIndex:
+    """Approximate nearest-neighbour index over L2-normalized scholarship vectors
+
+    The vectors are clustered with spherical k-means into n_lists inverted
+    lists. A query is only scored against the members of the n_probe lists
+    whose centroids are closest to it; raising n_probe trades latency for
+    recall. Catalogues smaller than min_rows are searched exactly.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, min_rows=20000, n_iter=10,
+                 block_size=65536, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_rows = min_rows
+        self.n_iter = n_iter
+        self.block_size = block_size
+        self.seed = seed
+        self.exact = True
+        self.centroids = None
+        self.order = None
+        self.offsets = None
+
+    def _assign(self, matrix):
+        """Closest centroid of every row, computed in blocks to bound memory"""
+        labels = np.empty(matrix.shape[0], dtype=np.int32)
+        for start in range(0, matrix.shape[0], self.block_size):
+            block = matrix[start:start + self.block_size]
+            labels[start:start + self.block_size] = np.asarray(
+                block @ self.centroids.T).argmax(axis=1)
+        return labels
+
+    def build(self, matrix):
+        """Cluster the rows of a sparse L2-normalized matrix into inverted lists"""
+        n_rows = matrix.shape[0]
+        self.exact = n_rows < self.min_rows
+        if self.exact:
+            return self
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_rows)))
+        rng = np.random.default_rng(self.seed)
+        seeds = rng.choice(n_rows, size=n_lists, replace=False)
+        self.centroids = matrix[seeds].toarray()
+
+        for _ in range(self.n_iter):
+            labels = self._assign(matrix)
+            # Sum of the members of each list, via a sparse one-hot membership matrix
+            membership = csr_matrix((np.ones(n_rows), (labels, np.arange(n_rows))),
+                                    shape=(n_lists, n_rows))
+            sums = (membership @ matrix).toarray()
+            empty = np.asarray(membership.sum(axis=1)).ravel() == 0
+            sums[empty] = self.centroids[empty]  # keep empty lists where they were
+            self.centroids = normalize(sums)
+
+        labels = self._assign(matrix)
+        self.order = np.argsort(labels, kind='stable')
+        self.offsets = np.searchsorted(labels[self.order], np.arange(n_lists + 1))
+        return self
+
+    def candidates(self, query_vector, n_probe=None):
+        """Sorted row positions in the lists closest to a query, or None for exact search"""
+        if self.exact:
+            return None
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        query = query_vector.toarray().ravel()
+        closeness = self.centroids @ query
+        lists = np.argpartition(-closeness, n_probe - 1)[:n_probe]
+        rows = [self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists]
+        return np.sort(np.concatenate(rows))
+
+
+def recall_at_k(exact_scores, retrieved, k):
+    """Share of the retrieved rows that belong in the exact top-k
+
+    Ties at the k-th score all count as correct, since any of them is an
+    equally good answer.
+    """
+    k = min(k, len(exact_scores))
+    if k == 0:
+        return 1.0
+    threshold = np.round(np.partition(exact_scores, len(exact_scores) - k)[-k], 12)
+    return float(np.sum(np.round(exact_scores[retrieved], 12) >= threshold)) / k
+
+def run_recall_benchmark(model, profiles, k=10, n_probes=(1, 2, 4, 8, 16), **index_params):
+    """Print latency and recall@k of the ANN search against exact search
+
+    The model itself is left as it was; the index is built on a copy.
+    """
+    exact = model.with_ann(None)
+    exact_scores = [exact.scores(profile) for profile in profiles]
+
+    start = time.perf_counter()
+    for profile in profiles:
+        exact.recommend(profile, k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(profiles)
+    print(f"{'n_probe':>8} {'ms/query':>10} {'recall@' + str(k):>10}")
+    print(f"{'exact':>8} {exact_ms:>10.2f} {1.0:>10.3f}")
+
+    index = model.build_ann_index(min_rows=0, **index_params).ann
+    positions = model.labels(np.arange(len(model.ids)))
+    for n_probe in n_probes:
+        probe = copy.copy(index)
+        probe.n_probe = n_probe
+        probed = model.with_ann(probe)
+        start = time.perf_counter()
+        results = [probed.recommend(profile, k) for profile in profiles]
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(profiles)
+        recall = np.mean([recall_at_k(scores, positions.get_indexer(result.index), k)
+                          for scores, result in zip(exact_scores, results)])
+        print(f"{n_probe:>8} {elapsed_ms:>10.2f} {recall:>10.3f}")
+
+if __name__ == "__main__":
+    import random
+    import pandas as pd
+    from filter_functions import load_dataset
+    from recommendation import RecommendationModel, PROFILE_KEYS, FEATURE_COLUMNS
+
+    # Scale the bundled dataset up to a larger catalogue for the benchmark
+    base = load_dataset()
+    df = pd.concat([base] * 200, ignore_index=True)
+    df['Scholarship_ID'] = df['Scholarship_ID'] + '-' + (df.index // len(base)).astype(str)
+    model = RecommendationModel(df).fit()
+
+    random.seed(0)
+    values = {key: base[column].astype(str).unique().tolist()
+              for key, column in zip(PROFILE_KEYS, FEATURE_COLUMNS)}
+    profiles = [{key: random.choice(options) for key, options in values.items()}
+                for _ in range(200)]
+    print(f"Benchmarking {len(df)} scholarships, {len(profiles)} profiles")
+    run_recall_benchmark(model, profiles)
@@ -1,67 +1,224 @@
 # app.py
-import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
 import os
+import threading
 
 # Import our modules
+# (visualizations is imported only when rendering, so that serving cached
+# charts never loads matplotlib)
 from filter_functions import *
-from visualizations import *
 from recommendation import *
+from chart_cache import ChartCache
+from chart_data import chart_json
+from dataset_snapshot import DatasetSnapshot
+from recommendation_table import RecommendationTable
 
 class ScholarshipFilterSystem:
-    def __init__(self, data_path='scholarship_dataset.csv'):
-        """Initialize the system with dataset"""
+    """Filtering, recommendations and reports over the scholarship dataset
+
+    All dataset state lives in one immutable DatasetSnapshot, so a single
+    instance can be shared by the threads of a web server: each request
+    reads self.snapshot once, and load_data() swaps in a new snapshot
+    atomically. Thread-safe callers use query(), which returns a ResultView
+    of row positions; apply_filters() additionally remembers the result
+    for the interactive visualize/export helpers.
+    """
+
+    def __init__(self, data_path='scholarship_dataset.csv', cache_size=1024,
+                 model_path=None, recommender='tfidf',
+                 chart_cache_dir=None, chart_cache_bytes=64 * 1024 ** 2):
+        """Initialize the system with dataset
+
+        The fitted recommender is persisted only when model_path is given;
+        the file is a pickle, so it must not come from an untrusted source.
+        Rendered charts are cached on disk only when chart_cache_dir is given.
+        recommender=None skips fitting a recommender, for filter/chart-only use.
+        """
         print("Initializing Scholarship Filter System...")
-        self.df = pd.read_csv(data_path)
-        self.filtered_df = self.df.copy()
-        print(f"Loaded {len(self.df)} scholarships from dataset")
+        self.model_path = model_path
+        self.recommender = recommender
+        self.cache_size = cache_size
+        self.charts = (ChartCache(chart_cache_dir, chart_cache_bytes)
+                       if chart_cache_dir is not None else None)
+        self.snapshot = None
+        self.results = None
+        self.table = None
+        self._reload_lock = threading.Lock()
+        self.load_data(data_path)
+
+    @property
+    def df(self):
+        """Dataset of the current snapshot"""
+        return self.snapshot.df
+
+    @property
+    def index(self):
+        return self.snapshot.index
+
+    @property
+    def model(self):
+        return self.snapshot.model
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @property
+    def filtered_df(self):
+        """The last apply_filters result as a DataFrame"""
+        return self.results.frame()
+
+    def load_data(self, data_path=None):
+        """(Re)load the dataset into a new snapshot and swap it in
+
+        Requests still running on the previous snapshot finish on it.
+        """
+        with self._reload_lock:
+            if data_path is not None:
+                self.data_path = data_path
+            if os.path.isdir(self.data_path):
+                # Columnar Parquet store written by columnar_store.convert_csv_to_parquet
+                from columnar_store import load_store
+                df = load_store(self.data_path)
+            elif self.data_path.endswith('.snap'):
+                # Memory-mapped snapshot shared by every worker on the machine
+                from snapshot import open_snapshot
+                df = open_snapshot(self.data_path)
+            else:
+                df = load_dataset(self.data_path, report=True)
+            model = None
+            if self.recommender is not None:
+                model = get_model(df, cache_path=self.model_path, engine=self.recommender,
+                                  frozen=True)
+            version = self.snapshot.version + 1 if self.snapshot is not None else 1
+            snapshot = DatasetSnapshot(df, version, model, self.cache_size)
+            if self.table is not None and model is not None:
+                # Stale keys are recomputed by refresh_recommendation_table or on lookup
+                self.table.invalidate(model)
+            self.snapshot = snapshot
+            self.results = snapshot.everything()
+        print(f"Loaded {len(df)} scholarships from dataset")
         
     def display_stats(self):
-        """Display basic statistics about the dataset"""
+        """Display basic statistics about the dataset, rolled up from its cube"""
+        snapshot = self.snapshot
+        cube = snapshot.cube
+        summary = cube.summary()
         print("\n=== SCHOLARSHIP DATASET STATISTICS ===")
-        print(f"Total Scholarships: {len(self.df)}")
-        print(f"States Covered: {len(self.df['State'].unique())}")
-        print(f"Scholarship Categories: {', '.join(sorted(self.df['Category'].unique()))}")
-        print(f"Amount Range: ₹{self.df['Amount'].min()} to ₹{self.df['Amount'].max()}")
-        print(f"Average Scholarship Amount: ₹{int(self.df['Amount'].mean())}")
+        print(f"Total Scholarships: {summary['count']}")
+        if not summary['count']:
+            return
+        print(f"States Covered: {len(cube.counts('State'))}")
+        print(f"Scholarship Categories: {', '.join(sorted(cube.counts('Category').index))}")
+        print(f"Amount Range: ₹{int(summary['amount_min'])} to ₹{int(summary['amount_max'])}")
+        print(f"Average Scholarship Amount: ₹{int(summary['amount_mean'])}")
         
         # Count active scholarships
-        today = datetime.now().strftime('%Y-%m-%d')
-        active_count = len(self.df[self.df['Application_Deadline'] >= today])
-        print(f"Active Scholarships: {active_count}")
+        print(f"Active Scholarships: {snapshot.active_count()}")
         
+    def query(self, **filter_kwargs):
+        """Rows matching the filters as a ResultView of the current snapshot"""
+        return self.snapshot.query(**filter_kwargs)
+
     def apply_filters(self, **filter_kwargs):
         """Apply selected filters to the dataset"""
-        self.filtered_df = apply_all_filters(self.df, **filter_kwargs)
-        return self.filtered_df
+        self.results = self.query(**filter_kwargs)
+        return self.results.frame()
+
+    def cache_stats(self):
+        """Report query cache hit/miss/eviction counters"""
+        return self.snapshot.cache.stats()
     
-    def visualize_data(self):
-        """Generate visualizations for filtered data"""
-        if len(self.filtered_df) == 0:
+    def visualize_data(self, results=None, output_dir='visualizations', headless=False,
+                       workers=None):
+        """Generate visualizations for filtered data (the last apply_filters by default)
+
+        headless=True renders the charts off-screen in a process pool, for
+        servers without a display. Returns the paths of the saved charts.
+        """
+        if results is None:
+            results = self.results
+        if len(results) == 0:
             print("No data to visualize! Please apply filters first.")
-            return
+            return []
             
-        print(f"Generating visualizations for {len(self.filtered_df)} scholarships...")
-        # Create output directory if it doesn't exist
-        os.makedirs('visualizations', exist_ok=True)
-        
+        print(f"Generating visualizations for {len(results)} scholarships...")
         # Generate all visualizations
-        generate_all_visualizations(self.filtered_df)
+        from visualizations import generate_all_visualizations
+        return generate_all_visualizations(results.frame(), output_dir, headless, workers,
+                                           cube=results.aggregate())
         
-    def get_recommendations(self, student_profile, top_n=10):
-        """Get personalized scholarship recommendations"""
-        results = get_personalized_recommendations(self.df, student_profile, top_n)
+    def chart_png(self, chart, results=None):
+        """PNG bytes of one chart (a visualizations.CHARTS name) for a ResultView
+
+        With a chart cache, charts are served from disk, keyed by chart,
+        filter and dataset content; only misses render with matplotlib.
+        """
+        if results is None:
+            results = self.results
+        if len(results) == 0:
+            raise ValueError("No data to chart! Please apply filters first.")
+        if self.charts is None:
+            from visualizations import render_view_png
+            return render_view_png(chart, results)
+        return self.charts.chart(chart, results)
+
+    def chart_data(self, chart, results=None):
+        """Compact JSON of one chart's aggregated data for a ResultView
+
+        The data-only counterpart of chart_png, for clients that draw the
+        chart themselves: only the aggregation runs on the server.
+        """
+        if results is None:
+            results = self.results
+        return chart_json(chart, results.aggregate())
+
+    def build_recommendation_table(self, top_n=10):
+        """Precompute recommendations for every distinct student profile"""
+        self.table = RecommendationTable.from_model(self.snapshot.model, top_n)
+        print(f"Precomputed recommendations for {self.table.n_keys} profiles")
+
+    def refresh_recommendation_table(self, max_keys=None):
+        """Recompute stale table entries after a reload; returns how many remain"""
+        return self.table.refresh(self.snapshot.model, max_keys)
+
+    def get_recommendations(self, student_profile, top_n=10, eligible_only=True):
+        """Get personalized scholarship recommendations
+
+        By default only scholarships the student is eligible for are ranked;
+        add a 'percentage' key to the profile to enforce minimum marks.
+        """
+        snapshot = self.snapshot
+        model = snapshot.model
+        if model is None:
+            raise ValueError("Recommendations are disabled (recommender=None)")
+        table = self.table
+        # Skip a table that already follows a newer snapshot than this request
+        if table is not None and table.model is model and top_n <= table.top_n:
+            results = table.recommend(student_profile, table.top_n, model)
+            if not eligible_only:
+                return results.iloc[:top_n]
+            # The eligible part of the precomputed top list is exact whenever
+            # it still holds top_n entries; otherwise rank the candidates live
+            eligible = model.labels(model.eligible_rows(student_profile, snapshot.index))
+            results = results[results.index.isin(eligible)]
+            if len(results) >= top_n:
+                return results.iloc[:top_n]
+        results = get_personalized_recommendations(snapshot.df, student_profile, top_n,
+                                                   model=model,
+                                                   eligible_only=eligible_only,
+                                                   index=snapshot.index)
         return results
         
-    def export_results(self, filename='filtered_scholarships.csv'):
-        """Export filtered results to CSV"""
-        if len(self.filtered_df) == 0:
+    def export_results(self, filename='filtered_scholarships.csv', results=None):
+        """Export filtered results to CSV (the last apply_filters by default)"""
+        if results is None:
+            results = self.results
+        if len(results) == 0:
             print("No data to export! Please apply filters first.")
             return
             
-        self.filtered_df.to_csv(filename, index=False)
-        print(f"Exported {len(self.filtered_df)} scholarships to {filename}")
+        results.to_csv(filename)
+        print(f"Exported {len(results)} scholarships to {filename}")
         
 if __name__ == "__main__":
     # Example usage
@@ -85,7 +242,8 @@ if __name__ == "__main__":
         'course': 'Engineering',
         'caste': 'OBC',
         'gender': 'Male',
-        'batch': '2024'
+        'batch': '2024',
+        'percentage': 85
     }
     
     recommendations = system.get_recommendations(student, top_n=5)
@@ -0,0 +1,127 @@
+# chart_cache.py
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Nothing here imports matplotlib: it is only loaded (through
+# visualizations) when a chart has to be rendered on a miss.
+
+# Part of every key; bump it when the charts' appearance changes
+CHART_FORMAT = 3
+
+def chart_key(chart, data_digest, dataset_version):
+    """Content address of one rendered chart"""
+    text = f'{CHART_FORMAT}\0{chart}\0{data_digest}\0{dataset_version}'
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def plan_digest(plan):
+    """Digest of a compiled filter plan (its predicates are plain tuples)"""
+    return hashlib.sha1(repr(plan).encode('utf-8')).hexdigest()
+
+def rows_digest(rows):
+    """Digest of a set of row positions"""
+    return hashlib.sha1(rows.astype('int64').tobytes()).hexdigest()
+
+def view_key(chart, view):
+    """Cache key for a chart of a ResultView
+
+    The view's filter plan identifies its rows when known, else the row
+    positions themselves are hashed. The snapshot's content fingerprint
+    stands in for the dataset version, so keys stay valid across restarts.
+    """
+    digest = plan_digest(view.plan) if view.plan is not None else rows_digest(view.rows)
+    return chart_key(chart, digest, view.snapshot.fingerprint)
+
+class ChartCache:
+    """Size-bounded LRU cache of rendered chart PNGs on disk
+
+    Files are named by their content address, written atomically and
+    evicted least recently used first once the directory holds more than
+    max_bytes. Recency is kept in the files' modification times, so a
+    restarted process picks up the existing cache in LRU order.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 ** 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        found = []
+        for name in os.listdir(directory):
+            if name.endswith('.png'):
+                stat = os.stat(os.path.join(directory, name))
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.png')
+
+    def get(self, key):
+        """PNG bytes stored under key, or None on a miss"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                # Removed behind our back, e.g. by another process sharing the directory
+                self.size -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """Store PNG bytes under key, evicting the least recently used charts"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self.size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self.size -= old_size
+                self.evictions += 1
+                try:
+                    os.remove(self._path(old_key))
+                except FileNotFoundError:
+                    pass
+
+    def chart(self, chart, view):
+        """PNG bytes of a chart of a ResultView, rendered only on a miss"""
+        key = view_key(chart, view)
+        data = self.get(key)
+        if data is None:
+            from visualizations import render_view_png
+            data = render_view_png(chart, view)
+            self.put(key, data)
+        return data
+
+    def stats(self):
+        """Hit/miss/eviction counters and the bytes held on disk"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,79 @@
+# chart_data.py
+import json
+
+from chart_cache import view_key
+
+# Data-only counterparts of the charts in visualizations.CHARTS: each
+# function rolls an AggregateCube up into the series its chart plots, as
+# plain JSON-ready values, so clients can render the chart themselves.
+
+def _round(values, digits=2):
+    return [round(float(v), digits) for v in values]
+
+def state_counts(cube):
+    """Scholarships per state, largest first"""
+    counts = cube.counts('State')
+    return {'labels': [str(v) for v in counts.index], 'counts': counts.tolist()}
+
+def amount_bins(cube, kde_points=100):
+    """Amount histogram in a few dozen bars over the occupied bins, with its binned KDE"""
+    distribution = cube.distribution()
+    if distribution.count == 0:
+        return {'scale': 'linear', 'edges': [], 'counts': [], 'kde': None}
+    bars = distribution.coarsen()
+    amounts, density = distribution.kde(kde_points)
+    return {
+        'scale': 'log' if distribution.log else 'linear',
+        'edges': _round(bars.edges),
+        'counts': bars.counts.tolist(),
+        # Expected count per bar along the curve, to overlay on the bars
+        'kde': {'amounts': _round(amounts),
+                'counts': _round(density * distribution.count * bars.step, 3)},
+    }
+
+def category_amount_boxes(cube):
+    """Box plot statistics of the amounts per category"""
+    boxes = []
+    for category, distribution in cube.distributions('Category').items():
+        stats = distribution.box_stats(str(category))
+        boxes.append({key: stats[key] if key == 'label' else round(float(stats[key]), 2)
+                      for key in ('label', 'whislo', 'q1', 'med', 'q3', 'whishi', 'mean')})
+    return {'boxes': boxes}
+
+def _shares(counts):
+    total = counts.sum()
+    return {'labels': [str(v) for v in counts.index], 'counts': counts.tolist(),
+            'shares': _round(counts / total, 4) if total else []}
+
+def eligibility_shares(cube):
+    """Caste and gender eligibility counts and shares"""
+    return {'caste': _shares(cube.counts('Eligibility_Caste')),
+            'gender': _shares(cube.counts('Eligibility_Gender'))}
+
+def batch_course_crosstab(cube):
+    """Scholarships per batch (rows) and course (columns)"""
+    table = cube.crosstab('Batch', 'Course_Applicable')
+    return {'batches': [str(v) for v in table.index],
+            'courses': [str(v) for v in table.columns],
+            'counts': table.to_numpy().tolist()}
+
+# Chart name (as in visualizations.CHARTS) -> its data function
+CHART_DATA = {
+    'scholarships_by_state': state_counts,
+    'scholarship_amounts': amount_bins,
+    'amounts_by_category': category_amount_boxes,
+    'eligibility_breakdown': eligibility_shares,
+    'batch_course_heatmap': batch_course_crosstab,
+}
+
+def chart_json(chart, cube):
+    """Compact JSON of one chart's data"""
+    return json.dumps(CHART_DATA[chart](cube), separators=(',', ':'))
+
+def chart_etag(chart, view):
+    """Entity tag for a chart's data over a ResultView
+
+    Derived from the chart, the view's filters and the dataset content
+    alone, so an unchanged chart is recognised without aggregating.
+    """
+    return view_key(chart + '.json', view)
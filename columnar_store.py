@@ -0,0 +1,120 @@
+# columnar_store.py
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from filter_functions import (CATEGORY_COLUMNS, DATE_COLUMNS, apply_schema,
+                              compile_filters)
+
+PARTITION_COLUMN = 'State'
+# Position of every row in the CSV, so loads can restore the CSV row order
+ROW_COLUMN = '_row'
+# Schema metadata key holding the CSV column order
+COLUMNS_KEY = b'csv_columns'
+
+def _to_plain(df):
+    """Store categoricals as their underlying values; Parquet dictionary-encodes them anyway"""
+    df = df.copy(deep=False)
+    for column in CATEGORY_COLUMNS:
+        if column in df and isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+def convert_csv_to_parquet(csv_path='scholarship_dataset.csv',
+                           store_path='scholarship_store',
+                           chunksize=100000, rows_per_group=50000):
+    """Convert the CSV import format into a Parquet store partitioned by State
+
+    The CSV is read in chunks so files larger than memory can be converted.
+    Each row keeps its CSV position, and the schema the CSV column order,
+    since partitioning moves State last and groups the rows by state.
+    """
+    # Chunk indexes continue across chunks, so they are the CSV row positions
+    chunks = (apply_schema(chunk).assign(**{ROW_COLUMN: chunk.index})
+              for chunk in pd.read_csv(csv_path, chunksize=chunksize))
+    first = _to_plain(next(chunks))
+    schema = pa.Schema.from_pandas(first, preserve_index=False)
+    csv_columns = [column for column in first.columns if column != ROW_COLUMN]
+    metadata = dict(schema.metadata or {})
+    metadata[COLUMNS_KEY] = json.dumps(csv_columns)
+    schema = schema.with_metadata(metadata)
+
+    def batches():
+        yield from pa.Table.from_pandas(first, schema=schema, preserve_index=False).to_batches()
+        for chunk in chunks:
+            table = pa.Table.from_pandas(_to_plain(chunk), schema=schema, preserve_index=False)
+            yield from table.to_batches()
+
+    ds.write_dataset(batches(), store_path, schema=schema, format='parquet',
+                     partitioning=[PARTITION_COLUMN], partitioning_flavor='hive',
+                     max_rows_per_group=rows_per_group,
+                     existing_data_behavior='delete_matching')
+
+def open_store(store_path='scholarship_store'):
+    """Open a Parquet store written by convert_csv_to_parquet"""
+    return ds.dataset(store_path, format='parquet', partitioning='hive')
+
+def _scalar(dataset, column, value):
+    if column in DATE_COLUMNS:
+        value = pd.Timestamp(value).to_pydatetime()
+    return pa.scalar(value, type=dataset.schema.field(column).type)
+
+def plan_to_expression(dataset, plan):
+    """Translate a compiled filter plan into a pyarrow dataset expression"""
+    expression = None
+    for predicate in plan:
+        kind, column = predicate[:2]
+        field = ds.field(column)
+        if kind == 'isin':
+            values, wildcard = predicate[2:]
+            condition = field.isin(pa.array(values, type=dataset.schema.field(column).type))
+            if wildcard is not None:
+                condition = condition | (field == _scalar(dataset, column, wildcard))
+        else:
+            low, high = predicate[2:]
+            condition = None
+            if low is not None:
+                condition = field >= _scalar(dataset, column, low)
+            if high is not None:
+                upper = field <= _scalar(dataset, column, high)
+                condition = upper if condition is None else condition & upper
+            if condition is None:
+                continue
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def _read(dataset, columns=None, expression=None):
+    """Typed frame of the matching rows, in CSV row and column order"""
+    if columns is None:
+        metadata = dataset.schema.metadata or {}
+        columns = json.loads(metadata[COLUMNS_KEY]) if COLUMNS_KEY in metadata else None
+    has_rows = ROW_COLUMN in dataset.schema.names
+    read = None if columns is None else list(columns) + [ROW_COLUMN] * has_rows
+    df = dataset.to_table(columns=read, filter=expression).to_pandas()
+    if has_rows:
+        df = df.sort_values(ROW_COLUMN, kind='stable', ignore_index=True)
+        df = df.drop(columns=ROW_COLUMN)
+    return apply_schema(df)
+
+def load_filtered(store_path='scholarship_store', columns=None, **filter_kwargs):
+    """Load only the rows and columns of the store that match the filters
+
+    Takes the same filter arguments as apply_all_filters. The predicates are
+    pushed down into the reader, so State partitions and row groups whose
+    statistics rule them out are never decoded. Rows come back in CSV order.
+    """
+    dataset = open_store(store_path)
+    return _read(dataset, columns, plan_to_expression(dataset, compile_filters(**filter_kwargs)))
+
+def load_store(store_path='scholarship_store', columns=None):
+    """Load the whole store (or a subset of its columns) as a typed DataFrame
+
+    Rows and columns come back in CSV order, as from load_dataset.
+    """
+    return _read(open_store(store_path), columns)
+
+if __name__ == "__main__":
+    convert_csv_to_parquet()
+    print("Converted 'scholarship_dataset.csv' to the Parquet store 'scholarship_store'")
@@ -0,0 +1,104 @@
+# dataset_snapshot.py
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from aggregate_cube import AggregateCube
+from filter_functions import _active_predicate, compile_filters, select_rows
+from indexes import ScholarshipIndex
+from query_cache import QueryCache
+
+class DatasetSnapshot:
+    """One immutable version of the dataset and everything derived from it
+
+    The frame, its indexes, the aggregate cube, the recommendation model
+    and the query cache are built together and never modified afterwards,
+    so any number of
+    threads can query a snapshot without locking. A reload builds a new
+    snapshot and swaps the reference; requests already holding the old one
+    finish on it undisturbed.
+    """
+
+    def __init__(self, df, version, model=None, cache_size=1024):
+        self.df = df
+        self.version = version
+        # Content hash: unlike version, stable across processes and restarts
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        self.fingerprint = hashlib.sha1(hashes.tobytes()).hexdigest()
+        self.index = ScholarshipIndex(df)
+        self.cube = AggregateCube.from_frame(df)
+        self.model = model
+        self.cache = QueryCache(cache_size)
+        self.cache.invalidate(version)
+        self.all_rows = np.arange(len(df))
+        self.all_rows.flags.writeable = False
+
+    def select(self, plan):
+        """Positions of the rows matching a compiled plan, cached per snapshot"""
+        rows = self.cache.get(plan)
+        if rows is None:
+            rows = select_rows(self.df, plan, self.index)
+            self.cache.put(plan, rows)
+        return rows
+
+    def aggregate(self, plan=()):
+        """AggregateCube of the rows matching a plan
+
+        Rolled up from the snapshot's cube when the plan allows it, else
+        aggregated from the matching rows.
+        """
+        cube = self.cube.select(plan)
+        if cube is None:
+            cube = AggregateCube.from_frame(self.df.iloc[self.select(plan)])
+        return cube
+
+    def active_count(self):
+        """Number of scholarships whose deadline has not passed"""
+        return self.index.sorted.count(_active_predicate())
+
+    def query(self, **filter_kwargs):
+        """ResultView of the rows matching the filters of apply_all_filters"""
+        plan = compile_filters(**filter_kwargs)
+        return ResultView(self, self.select(plan), plan)
+
+    def everything(self):
+        """ResultView of every row"""
+        return ResultView(self, self.all_rows, ())
+
+
+class ResultView:
+    """Query result held as read-only row positions into a snapshot
+
+    Nothing is copied until frame() is called, so a view per session or
+    request costs only its row array.
+    """
+
+    def __init__(self, snapshot, rows, plan=None):
+        self.snapshot = snapshot
+        self.rows = rows
+        self.plan = plan
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def frame(self, columns=None):
+        """The rows as a DataFrame, optionally limited to some columns"""
+        df = self.snapshot.df
+        if columns is None:
+            return df.iloc[self.rows]
+        return df.iloc[self.rows, [df.columns.get_loc(c) for c in columns]]
+
+    def aggregate(self):
+        """AggregateCube of the rows in the view"""
+        if self.plan is None:
+            return AggregateCube.from_frame(self.frame())
+        return self.snapshot.aggregate(self.plan)
+
+    def to_csv(self, path):
+        """Write the rows to a CSV file"""
+        self.frame().to_csv(path, index=False)
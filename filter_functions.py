@@ -1,83 +1,336 @@
 # filter_functions.py
 import pandas as pd
-from datetime import datetime
+import numpy as np
+from datetime import datetime, timedelta
 
-def load_dataset(file_path='scholarship_dataset.csv'):
-    """Load the scholarship dataset from CSV"""
-    return pd.read_csv(file_path)
+# Column values that make a scholarship open to every applicant
+WILDCARDS = {
+    'Eligibility_Caste': 'All',
+    'Eligibility_Gender': 'All',
+    'Course_Applicable': 'Any',
+}
 
-def filter_by_state(df, states=None):
-    """Filter scholarships by state(s)"""
+# Dataset schema applied at load time
+# Low-cardinality columns stored as pandas categoricals
+CATEGORY_COLUMNS = ['State', 'Category', 'Batch', 'Eligibility_Caste',
+                    'Eligibility_Gender', 'Course_Applicable']
+# Integer columns downcast to the smallest sufficient width
+INTEGER_COLUMNS = ['Amount', 'Min_Percentage_Required']
+# Columns holding 'YYYY-MM-DD' dates, compared as dates rather than strings
+DATE_COLUMNS = ['Application_Start_Date', 'Application_Deadline']
+
+def memory_usage_mb(df):
+    """Deep memory usage of a DataFrame in megabytes"""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+def apply_schema(df):
+    """Convert a raw CSV frame to the compact typed representation"""
+    df = df.copy(deep=False)
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    for column in INTEGER_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    for column in DATE_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], format='%Y-%m-%d')
+    return df
+
+def load_dataset(file_path='scholarship_dataset.csv', typed=True, report=False):
+    """Load the scholarship dataset from CSV
+
+    With typed=True the schema above is applied once at load time, and
+    report=True prints the memory usage before and after the conversion.
+    """
+    df = pd.read_csv(file_path)
+    if not typed:
+        return df
+
+    before = memory_usage_mb(df) if report else None
+    df = apply_schema(df)
+    if report:
+        print(f"Memory usage: {before:.2f} MB -> {memory_usage_mb(df):.2f} MB")
+    return df
+
+# --- Predicates ---------------------------------------------------------
+# A predicate is a plain hashable tuple so compiled plans can be compared,
+# cached and shared between queries:
+#   ('isin', column, values, wildcard)  -> column in values (or == wildcard)
+#   ('range', column, low, high)        -> low <= column <= high (None = open)
+
+def _values(values):
+    """Canonical form of a list of filter values (deduplicated and sorted)"""
+    return tuple(sorted(set(values), key=str))
+
+def _state_predicate(states):
     if not states or 'All' in states:
+        return None
+    return ('isin', 'State', _values(states), None)
+
+def _caste_predicate(castes):
+    if not castes or 'All' in castes:
+        return None
+    return ('isin', 'Eligibility_Caste', _values(castes), WILDCARDS['Eligibility_Caste'])
+
+def _gender_predicate(gender):
+    if not gender or gender == 'All':
+        return None
+    return ('isin', 'Eligibility_Gender', (gender,), WILDCARDS['Eligibility_Gender'])
+
+def _amount_predicate(min_amount=0, max_amount=None):
+    return ('range', 'Amount', min_amount, max_amount or None)
+
+def _batch_predicate(batches):
+    if not batches:
+        return None
+    return ('isin', 'Batch', _values(batches), None)
+
+def _category_predicate(categories):
+    if not categories:
+        return None
+    return ('isin', 'Category', _values(categories), None)
+
+def _course_predicate(courses):
+    if not courses:
+        return None
+    return ('isin', 'Course_Applicable', _values(courses), WILDCARDS['Course_Applicable'])
+
+def _percentage_predicate(min_percentage=0):
+    return ('range', 'Min_Percentage_Required', None, min_percentage)
+
+def _today():
+    return datetime.now().strftime('%Y-%m-%d')
+
+def _active_predicate():
+    return ('range', 'Application_Deadline', _today(), None)
+
+def _closing_soon_predicate(days=None):
+    if days is None:
+        return None
+    last_day = (datetime.now() + timedelta(days=days)).strftime('%Y-%m-%d')
+    return ('range', 'Application_Deadline', _today(), last_day)
+
+def compile_filters(states=None, castes=None, gender=None,
+                    min_amount=0, max_amount=None, batches=None,
+                    categories=None, courses=None, min_percentage=0,
+                    active_only=False, closing_within_days=None):
+    """Normalize filter arguments into a tuple of predicates (a query plan)"""
+    plan = [
+        _state_predicate(states),
+        _caste_predicate(castes),
+        _gender_predicate(gender),
+        _amount_predicate(min_amount, max_amount),
+        _batch_predicate(batches),
+        _category_predicate(categories),
+        _course_predicate(courses),
+        _percentage_predicate(min_percentage),
+    ]
+    if active_only:
+        plan.append(_active_predicate())
+    plan.append(_closing_soon_predicate(closing_within_days))
+    return tuple(p for p in plan if p is not None)
+
+def compile_eligibility(caste=None, gender=None, course=None, batch=None,
+                        percentage=None, active_only=True):
+    """Query plan of the hard eligibility constraints for one student
+
+    Unlike compile_filters, a missing percentage adds no constraint.
+    """
+    plan = [
+        _caste_predicate([caste] if caste else None),
+        _gender_predicate(gender),
+        _course_predicate([course] if course else None),
+        _batch_predicate([batch] if batch else None),
+    ]
+    if percentage is not None:
+        plan.append(_percentage_predicate(percentage))
+    if active_only:
+        plan.append(_active_predicate())
+    return tuple(p for p in plan if p is not None)
+
+def predicate_mask(df, predicate, rows=None):
+    """Evaluate a single predicate to a boolean array over the rows of df
+
+    When rows is given only those row positions are evaluated.
+    """
+    kind, column = predicate[:2]
+    col = df[column] if rows is None else df[column].iloc[rows]
+    if kind == 'isin':
+        values, wildcard = predicate[2:]
+        mask = col.isin(values)
+        if wildcard is not None:
+            mask |= col == wildcard
+        return mask.to_numpy(dtype=bool)
+
+    low, high = predicate[2:]
+    if column in DATE_COLUMNS:
+        col = pd.to_datetime(col)
+        low = None if low is None else pd.Timestamp(low)
+        high = None if high is None else pd.Timestamp(high)
+    mask = np.ones(len(col), dtype=bool)
+    if low is not None:
+        mask &= (col >= low).to_numpy(dtype=bool)
+    if high is not None:
+        mask &= (col <= high).to_numpy(dtype=bool)
+    return mask
+
+def build_mask(df, plan):
+    """AND together the masks of every predicate in a compiled plan"""
+    mask = np.ones(len(df), dtype=bool)
+    for predicate in plan:
+        mask &= predicate_mask(df, predicate)
+    return mask
+
+def select_rows(df, plan, index=None):
+    """Evaluate a compiled plan to the positions of the matching rows
+
+    When a ScholarshipIndex built over df is given, the predicates it can
+    answer are resolved from the index instead of scanning the columns.
+    """
+    if index is not None:
+        return index.select(df, plan)
+    return np.flatnonzero(build_mask(df, plan))
+
+def apply_filters_batch(df, queries, index=None, as_matrix=False):
+    """Evaluate many filter specs against df in one pass
+
+    Parameters:
+    -----------
+    df : DataFrame
+        The scholarship dataset
+    queries : list of dict
+        Keyword arguments for apply_all_filters, one dict per query
+    index : ScholarshipIndex, optional
+        Index over df used to answer the categorical predicates
+    as_matrix : bool
+        Return a sparse query x scholarship match matrix instead of arrays
+
+    Returns:
+    --------
+    List of row-position arrays aligned with queries, or a scipy CSR
+    boolean matrix of shape (len(queries), len(df)) when as_matrix is set
+    """
+    plans = [compile_filters(**query) for query in queries]
+
+    # Each distinct predicate is evaluated once and kept as a packed bitset,
+    # and each distinct plan is ANDed together once
+    predicate_bits = {}
+    plan_rows = {}
+    all_bits = np.packbits(np.ones(len(df), dtype=bool))
+    for plan in plans:
+        if plan in plan_rows:
+            continue
+        bits = all_bits
+        for predicate in plan:
+            if predicate not in predicate_bits:
+                found = None if index is None else index.bitmap.lookup(predicate)
+                if found is None:
+                    found = np.packbits(predicate_mask(df, predicate))
+                predicate_bits[predicate] = found
+            bits = bits & predicate_bits[predicate]
+        plan_rows[plan] = np.flatnonzero(np.unpackbits(bits, count=len(df)))
+
+    results = [plan_rows[plan] for plan in plans]
+    if not as_matrix:
+        return results
+
+    from scipy.sparse import csr_matrix
+    indptr = np.zeros(len(results) + 1, dtype=np.int64)
+    np.cumsum([len(rows) for rows in results], out=indptr[1:])
+    indices = np.concatenate(results) if results else np.empty(0, dtype=np.int64)
+    data = np.ones(len(indices), dtype=bool)
+    return csr_matrix((data, indices, indptr), shape=(len(results), len(df)))
+
+def iter_filtered_chunks(file_path='scholarship_dataset.csv', chunksize=100000,
+                         **filter_kwargs):
+    """Stream a CSV in chunks, yielding the matching rows of each chunk
+
+    Takes the same filter arguments as apply_all_filters. Peak memory is
+    bounded by chunksize rather than by the size of the file.
+    """
+    plan = compile_filters(**filter_kwargs)
+    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+        chunk = apply_schema(chunk)
+        matches = chunk.iloc[select_rows(chunk, plan)]
+        if len(matches):
+            yield matches
+
+def stream_filtered_csv(file_path, output_path, chunksize=100000, **filter_kwargs):
+    """Write the rows matching the filters to output_path chunk by chunk
+
+    Returns the number of rows written.
+    """
+    # Header first, so the output is valid even when nothing matches
+    pd.read_csv(file_path, nrows=0).to_csv(output_path, index=False)
+    count = 0
+    for matches in iter_filtered_chunks(file_path, chunksize, **filter_kwargs):
+        matches.to_csv(output_path, mode='a', header=False, index=False)
+        count += len(matches)
+    return count
+
+def _select(df, predicate):
+    """Apply one predicate, returning df untouched when it is a no-op"""
+    if predicate is None:
         return df
-    return df[df['State'].isin(states)]
+    return df[predicate_mask(df, predicate)]
+
+# --- Individual filters -------------------------------------------------
+
+def filter_by_state(df, states=None):
+    """Filter scholarships by state(s)"""
+    return _select(df, _state_predicate(states))
 
 def filter_by_caste(df, castes=None):
     """Filter scholarships by caste eligibility"""
-    if not castes or 'All' in castes:
-        return df
     # Include scholarships marked as 'All' and those matching specified castes
-    return df[(df['Eligibility_Caste'].isin(castes)) | (df['Eligibility_Caste'] == 'All')]
+    return _select(df, _caste_predicate(castes))
 
 def filter_by_gender(df, gender=None):
     """Filter scholarships by gender eligibility"""
-    if not gender or gender == 'All':
-        return df
     # Include scholarships marked as 'All' and those matching specified gender
-    return df[(df['Eligibility_Gender'] == gender) | (df['Eligibility_Gender'] == 'All')]
+    return _select(df, _gender_predicate(gender))
 
 def filter_by_amount(df, min_amount=0, max_amount=None):
     """Filter scholarships by amount range"""
-    if max_amount:
-        return df[(df['Amount'] >= min_amount) & (df['Amount'] <= max_amount)]
-    return df[df['Amount'] >= min_amount]
+    return _select(df, _amount_predicate(min_amount, max_amount))
 
 def filter_by_batch(df, batches=None):
     """Filter scholarships by applicable batch years"""
-    if not batches:
-        return df
-    return df[df['Batch'].isin(batches)]
+    return _select(df, _batch_predicate(batches))
 
 def filter_by_category(df, categories=None):
     """Filter scholarships by category"""
-    if not categories:
-        return df
-    return df[df['Category'].isin(categories)]
+    return _select(df, _category_predicate(categories))
 
 def filter_by_course(df, courses=None):
     """Filter scholarships by applicable courses"""
-    if not courses:
-        return df
     # Include scholarships marked as 'Any' and those matching specified courses
-    return df[(df['Course_Applicable'].isin(courses)) | (df['Course_Applicable'] == 'Any')]
+    return _select(df, _course_predicate(courses))
 
 def filter_by_percentage(df, min_percentage=0):
     """Filter scholarships by minimum required percentage"""
-    return df[df['Min_Percentage_Required'] <= min_percentage]
+    return _select(df, _percentage_predicate(min_percentage))
 
 def filter_active_scholarships(df):
     """Filter currently active scholarships (application date not passed)"""
-    today = datetime.now().strftime('%Y-%m-%d')
-    return df[df['Application_Deadline'] >= today]
+    return _select(df, _active_predicate())
 
-def apply_all_filters(df, states=None, castes=None, gender=None, 
+def filter_closing_soon(df, days=7):
+    """Filter scholarships whose deadline falls within the next few days"""
+    return _select(df, _closing_soon_predicate(days))
+
+def apply_all_filters(df, states=None, castes=None, gender=None,
                      min_amount=0, max_amount=None, batches=None,
                      categories=None, courses=None, min_percentage=0,
-                     active_only=False):
-    """Apply all filters sequentially"""
-    filtered_df = df.copy()
-    
-    filtered_df = filter_by_state(filtered_df, states)
-    filtered_df = filter_by_caste(filtered_df, castes)
-    filtered_df = filter_by_gender(filtered_df, gender)
-    filtered_df = filter_by_amount(filtered_df, min_amount, max_amount)
-    filtered_df = filter_by_batch(filtered_df, batches)
-    filtered_df = filter_by_category(filtered_df, categories)
-    filtered_df = filter_by_course(filtered_df, courses)
-    filtered_df = filter_by_percentage(filtered_df, min_percentage)
-    
-    if active_only:
-        filtered_df = filter_active_scholarships(filtered_df)
-    
-    return filtered_df
+                     active_only=False, closing_within_days=None, index=None):
+    """Apply all filters in a single pass over the original columns
 
+    Pass a ScholarshipIndex built over df to answer the categorical and
+    range filters from the index instead of scanning the columns.
+    """
+    plan = compile_filters(states, castes, gender, min_amount, max_amount,
+                           batches, categories, courses, min_percentage,
+                           active_only, closing_within_days)
+    # Only the final row selection is materialized
+    return df.iloc[select_rows(df, plan, index)]
@@ -0,0 +1,168 @@
+# indexes.py
+import numpy as np
+import pandas as pd
+
+from filter_functions import WILDCARDS, DATE_COLUMNS, build_mask, predicate_mask
+
+# Low-cardinality eligibility columns answered by the bitmap index
+CATEGORICAL_COLUMNS = ['State', 'Eligibility_Caste', 'Eligibility_Gender',
+                       'Batch', 'Category', 'Course_Applicable']
+
+# Numeric and date columns answered by the sorted range index
+RANGE_COLUMNS = ['Amount', 'Min_Percentage_Required', 'Application_Deadline']
+
+class BitmapIndex:
+    """Inverted index holding one packed bitset per (column, value) pair"""
+
+    def __init__(self, df, columns=CATEGORICAL_COLUMNS):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        self.wildcard_bits = {}
+        for column in columns:
+            codes, uniques = pd.factorize(df[column])
+            bitmaps = {value: np.packbits(codes == code)
+                       for code, value in enumerate(uniques)}
+
+            # Fold the wildcard rows ('All'/'Any') into every value's bitset
+            # so a lookup never has to OR them in at query time
+            wildcard = WILDCARDS.get(column)
+            if wildcard is not None:
+                wild = bitmaps.pop(wildcard, self._empty())
+                bitmaps = {value: bits | wild for value, bits in bitmaps.items()}
+                self.wildcard_bits[column] = wild
+            self.bitmaps[column] = bitmaps
+
+    def lookup(self, predicate):
+        """Packed bitset of rows matching an 'isin' predicate, or None if not indexed"""
+        kind, column = predicate[:2]
+        if kind != 'isin' or column not in self.bitmaps:
+            return None
+        values, wildcard = predicate[2:]
+        folded = column in self.wildcard_bits
+        if (wildcard is not None) != folded:
+            return None
+
+        bitmaps = self.bitmaps[column]
+        # Values missing from the data still match the wildcard rows
+        empty = self.wildcard_bits[column] if folded else self._empty()
+        result = None
+        for value in values:
+            bits = bitmaps.get(value, empty)
+            result = bits.copy() if result is None else result | bits
+        return result
+
+    def _empty(self):
+        return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def unpack(self, bits):
+        """Expand a packed bitset into a boolean row mask"""
+        return np.unpackbits(bits, count=self.n_rows).view(bool)
+
+    def test(self, bits, rows):
+        """Boolean array telling which of the given row positions are set in bits"""
+        return ((bits[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+
+def _to_days(values):
+    """Convert dates to int day ordinals (days since 1970-01-01)"""
+    days = pd.to_datetime(values).to_numpy().astype('datetime64[D]')
+    return days.astype(np.int32)
+
+class SortedIndex:
+    """Argsorted position arrays answering range predicates by binary search"""
+
+    def __init__(self, df, columns=RANGE_COLUMNS):
+        self.n_rows = len(df)
+        self.values = {}
+        self.order = {}
+        self.sorted_values = {}
+        for column in columns:
+            if column in DATE_COLUMNS:
+                values = _to_days(df[column])
+            else:
+                values = df[column].to_numpy()
+            order = np.argsort(values, kind='stable')
+            self.values[column] = values
+            self.order[column] = order
+            self.sorted_values[column] = values[order]
+
+    def span(self, predicate):
+        """Resolve a 'range' predicate to its slice of the sorted order, or None"""
+        kind, column = predicate[:2]
+        if kind != 'range' or column not in self.order:
+            return None
+        low, high = predicate[2:]
+        if column in DATE_COLUMNS:
+            low = None if low is None else _to_days([low])[0]
+            high = None if high is None else _to_days([high])[0]
+
+        sorted_values = self.sorted_values[column]
+        start = 0 if low is None else np.searchsorted(sorted_values, low, 'left')
+        stop = len(sorted_values) if high is None else np.searchsorted(sorted_values, high, 'right')
+        return column, start, max(start, stop), low, high
+
+    def count(self, predicate):
+        """Number of rows matching a 'range' predicate on an indexed column"""
+        _, start, stop = self.span(predicate)[:3]
+        return int(stop - start)
+
+    def rows(self, span):
+        """Sorted row positions inside a span"""
+        column, start, stop = span[:3]
+        return np.sort(self.order[column][start:stop])
+
+    def test(self, span, rows):
+        """Boolean array telling which of the given row positions fall inside a span"""
+        column, _, _, low, high = span
+        values = self.values[column][rows]
+        mask = np.ones(len(rows), dtype=bool)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+
+
+class ScholarshipIndex:
+    """Bitmap and sorted indexes over one dataset, built once at load time"""
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.bitmap = BitmapIndex(df)
+        self.sorted = SortedIndex(df)
+
+    def select(self, df, plan):
+        """Positions of the rows matching a compiled plan"""
+        bits = None
+        spans = []
+        remaining = []
+        for predicate in plan:
+            found = self.bitmap.lookup(predicate)
+            if found is not None:
+                bits = found if bits is None else bits & found
+                continue
+            span = self.sorted.span(predicate)
+            if span is not None:
+                spans.append(span)
+                continue
+            remaining.append(predicate)
+
+        # Drive the query from the narrowest range: O(log n + k) to find its
+        # rows, after which every other predicate is only tested on those k.
+        # A wide range loses to unpacking the bitmap in one vectorized pass.
+        spans.sort(key=lambda span: span[2] - span[1])
+        if spans and (bits is None or spans[0][2] - spans[0][1] <= self.n_rows // 8):
+            rows = self.sorted.rows(spans.pop(0))
+            if bits is not None:
+                rows = rows[self.bitmap.test(bits, rows)]
+        elif bits is not None:
+            rows = np.flatnonzero(self.bitmap.unpack(bits))
+        else:
+            rows = np.flatnonzero(build_mask(df, remaining))
+            remaining = []
+
+        for span in spans:
+            rows = rows[self.sorted.test(span, rows)]
+        for predicate in remaining:
+            rows = rows[predicate_mask(df, predicate, rows)]
+        return rows
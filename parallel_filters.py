@@ -0,0 +1,164 @@
+# parallel_filters.py
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from filter_functions import compile_filters, predicate_mask, select_rows
+from snapshot import open_snapshot, write_snapshot
+
+# Below this many rows the process pool costs more than it saves
+MIN_PARALLEL_ROWS = 200000
+
+# Worker-process state, set up once by _init_worker
+_worker_df = None
+_worker_state_rows = None
+
+def _init_worker(snapshot_path):
+    """Memory-map the shared snapshot in a worker process"""
+    global _worker_df, _worker_state_rows
+    _worker_df = open_snapshot(snapshot_path)
+    _worker_state_rows = None
+
+def _state_rows(states):
+    """Row positions belonging to the given states, grouped once per worker"""
+    global _worker_state_rows
+    if _worker_state_rows is None:
+        codes, uniques = pd.factorize(_worker_df['State'])
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        _worker_state_rows = {state: order[bounds[i]:bounds[i + 1]]
+                              for i, state in enumerate(uniques)}
+    empty = np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate([_worker_state_rows.get(s, empty) for s in states]))
+
+def _filter_shard(plan, shard):
+    """Evaluate a plan on one shard, returning global row positions"""
+    if shard[0] == 'rows':
+        start, stop = shard[1:]
+        return select_rows(_worker_df.iloc[start:stop], plan) + start
+
+    rows = _state_rows(shard[1])
+    for predicate in plan:
+        rows = rows[predicate_mask(_worker_df, predicate, rows)]
+    return rows
+
+class ShardedFilter:
+    """Evaluate filter plans across a process pool over a shared snapshot
+
+    The dataset is written once to a memory-mapped snapshot that every
+    worker opens, so rows are never pickled to the workers. Shards are
+    contiguous row ranges (shard_by='rows') or groups of states
+    (shard_by='State'); partial results are merged in the original order.
+    """
+
+    def __init__(self, df, workers=None, shard_by='rows', min_rows=MIN_PARALLEL_ROWS):
+        self.df = df
+        self.workers = workers or os.cpu_count()
+        self.shard_by = shard_by
+        self.serial = self.workers == 1 or len(df) < min_rows
+        self._pool = None
+        self._snapshot_path = None
+        if self.serial:
+            return
+
+        # Prefer RAM-backed storage for the snapshot where available
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        fd, self._snapshot_path = tempfile.mkstemp(suffix='.snap', dir=directory)
+        os.close(fd)
+        write_snapshot(df, self._snapshot_path)
+        self.shards = self._make_shards()
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                         initargs=(self._snapshot_path,))
+
+    def _make_shards(self):
+        if self.shard_by == 'rows':
+            bounds = np.linspace(0, len(self.df), self.workers + 1).astype(int)
+            return [('rows', int(bounds[i]), int(bounds[i + 1])) for i in range(self.workers)]
+
+        # Greedily balance states across workers by row count
+        counts = self.df['State'].value_counts()
+        bins = [[] for _ in range(self.workers)]
+        loads = [0] * self.workers
+        for state, count in counts[counts > 0].items():
+            i = loads.index(min(loads))
+            bins[i].append(state)
+            loads[i] += count
+        return [('State', tuple(states)) for states in bins if states]
+
+    def select(self, plan):
+        """Positions of the rows matching a compiled plan"""
+        if self.serial:
+            return select_rows(self.df, plan)
+
+        shards = self.shards
+        if self.shard_by == 'State':
+            # Skip shards holding none of the requested states
+            for predicate in plan:
+                if predicate[:2] == ('isin', 'State'):
+                    wanted = set(predicate[2])
+                    shards = [s for s in shards if wanted.intersection(s[1])]
+
+        parts = list(self._pool.map(_filter_shard, [plan] * len(shards), shards))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate(parts)
+        return rows if self.shard_by == 'rows' else np.sort(rows)
+
+    def filter(self, **filter_kwargs):
+        """Same as apply_all_filters, evaluated across the pool"""
+        return self.df.iloc[self.select(compile_filters(**filter_kwargs))]
+
+    def close(self):
+        """Shut down the pool and remove the shared snapshot"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._snapshot_path is not None:
+            os.remove(self._snapshot_path)
+            self._snapshot_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def apply_all_filters_parallel(df, workers=None, shard_by='rows',
+                               min_rows=MIN_PARALLEL_ROWS, **filter_kwargs):
+    """One-off parallel apply_all_filters; reuse a ShardedFilter for many queries"""
+    with ShardedFilter(df, workers, shard_by, min_rows) as sharded:
+        return sharded.filter(**filter_kwargs)
+
+def run_scaling_benchmark(df, queries, max_workers=None, repeat=3):
+    """Time a set of queries with 1..max_workers processes and print the speedup"""
+    max_workers = max_workers or os.cpu_count()
+    plans = [compile_filters(**query) for query in queries]
+    baseline = None
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+    for workers in range(1, max_workers + 1):
+        with ShardedFilter(df, workers, min_rows=0) as sharded:
+            sharded.select(plans[0])  # warm up the pool
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for plan in plans:
+                    sharded.select(plan)
+            elapsed = (time.perf_counter() - start) / repeat
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.3f} {baseline / elapsed:>8.2f}")
+
+if __name__ == "__main__":
+    from filter_functions import load_dataset
+
+    # Scale the bundled dataset up to a few million rows for the benchmark
+    base = load_dataset()
+    df = pd.concat([base] * 2000, ignore_index=True)
+    print(f"Benchmarking {len(df)} rows")
+    run_scaling_benchmark(df, [
+        dict(castes=['OBC'], gender='Female', min_percentage=80),
+        dict(states=['Delhi', 'Kerala'], min_amount=20000, max_amount=90000, min_percentage=95),
+        dict(courses=['Engineering'], batches=[2024, 2025], min_percentage=70),
+    ])
@@ -0,0 +1,60 @@
+# query_cache.py
+import threading
+from collections import OrderedDict
+
+class QueryCache:
+    """Bounded LRU cache mapping compiled filter plans to matching row positions
+
+    Entries belong to one dataset version; moving to a new version drops
+    them all. Cached row arrays are read-only so callers cannot corrupt them.
+    The cache can be shared between threads.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def invalidate(self, version):
+        """Drop every entry and start caching results for a new dataset version"""
+        with self._lock:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, plan):
+        """Cached row positions for a plan, or None on a miss"""
+        with self._lock:
+            rows = self._entries.get(plan)
+            if rows is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(plan)
+            self.hits += 1
+            return rows
+
+    def put(self, plan, rows):
+        """Store the row positions for a plan, evicting the least recently used"""
+        rows.flags.writeable = False
+        with self._lock:
+            self._entries[plan] = rows
+            self._entries.move_to_end(plan)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Hit/miss/eviction counters for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'version': self.version,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
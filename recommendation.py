@@ -1,30 +1,735 @@
 # recommendation.py
+import copy
+import hashlib
+import os
+import pickle
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from pandas.api.types import union_categoricals
+from scipy.sparse import csr_matrix, diags, vstack
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from ann_index import IVFIndex
+from filter_functions import WILDCARDS, apply_schema, compile_eligibility, select_rows
+
+# Scholarship fields combined into the text features, in order
+FEATURE_COLUMNS = ['State', 'Category', 'Eligibility_Caste',
+                   'Eligibility_Gender', 'Course_Applicable', 'Batch']
+
+# Student profile keys matching FEATURE_COLUMNS, in the same order
+PROFILE_KEYS = ['state', 'category', 'caste', 'gender', 'course', 'batch']
+
+# Columns returned with every recommendation
+RESULT_COLUMNS = ['Scholarship_ID', 'Scholarship_Name', 'Amount',
+                  'State', 'Category', 'similarity_score']
+
+# Version of the persisted model state, bumped when the engines change
+MODEL_FORMAT = 4
+
+# Share of removed (tombstoned) rows that triggers a compaction
+COMPACT_RATIO = 0.25
+
+# Segments of added rows kept apart before they are merged into one
+MAX_SEGMENTS = 8
 
 def prepare_profile_features(df):
-    """Prepare text features for content-based recommendation"""
-    # Convert Batch column to string before concatenation
-    df['Batch'] = df['Batch'].astype(str)
-    
+    """Text features for content-based recommendation, one per scholarship
+
+    Returns a new Series; df itself is never modified, so it can be shared
+    with concurrent filter requests.
+    """
+    # Columns may be categorical (and Batch numeric), so convert to strings
+    fields = [df[column].astype(str) for column in FEATURE_COLUMNS]
+
     # Combine relevant fields into a single feature text
-    df['features'] = (
-        df['State'] + ' ' + 
-        df['Category'] + ' ' + 
-        df['Eligibility_Caste'] + ' ' + 
-        df['Eligibility_Gender'] + ' ' + 
-        df['Course_Applicable'] + ' ' + 
-        df['Batch']
-    )
-    return df
-
-
-def get_personalized_recommendations(df, student_profile, top_n=10):
+    features = fields[0]
+    for field in fields[1:]:
+        features = features + ' ' + field
+    return features.rename('features')
+
+def _freeze(array):
+    """Mark an array owned by a fitted engine read-only"""
+    array.flags.writeable = False
+    return array
+
+def profile_text(student_profile):
+    """Build the feature text for a student profile"""
+    return ' '.join(str(student_profile.get(key, '')) for key in PROFILE_KEYS)
+
+def top_k(scores, k, amounts, ids):
+    """Positions of the k highest scores, best first
+
+    Uses argpartition instead of a full sort. Ties are broken
+    deterministically by higher Amount, then by Scholarship_ID.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    # Rounding makes ties exact regardless of floating-point summation order
+    scores = np.round(scores, 12)
+    if k < n:
+        # Everything scoring at least the k-th best, so boundary ties all compete
+        threshold = scores[np.argpartition(-scores, k - 1)[:k]].min()
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((ids[candidates], -amounts[candidates], -scores[candidates]))
+    return candidates[order[:k]]
+
+def _top_k_block(scores, k, amounts, ids, dead=None):
+    """Row-wise top_k over a dense block of scores, skipping dead rows"""
+    if dead is not None:
+        scores[:, dead] = -np.inf
+    k = min(k, scores.shape[1])
+    indices = np.empty((scores.shape[0], k), dtype=np.int64)
+    for i, row in enumerate(scores):
+        indices[i] = top_k(row, k, amounts, ids)
+    return indices, np.take_along_axis(scores, indices, axis=1)
+
+# Scoring state of a batch worker process, set up once by _init_batch_worker
+_worker_state = None
+
+def _init_batch_worker(engine, amounts, ids, dead):
+    global _worker_state
+    _worker_state = (engine, amounts, ids, dead)
+
+def _score_block_in_worker(profile_block, top_n):
+    engine, amounts, ids, dead = _worker_state
+    return _top_k_block(engine.score(profile_block), top_n, amounts, ids, dead)
+
+def dataset_fingerprint(df):
+    """Hash of the columns the model is fitted and ranks on, used to detect dataset changes"""
+    columns = ['Scholarship_ID', 'Amount'] + FEATURE_COLUMNS
+    hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    return hashlib.sha1(hashes.to_numpy().tobytes()).hexdigest()
+
+def _concat_frames(frames):
+    """Frames stacked in order, keeping the categorical columns of the first categorical"""
+    combined = pd.concat(frames)
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            # e.g. text columns of a memory-mapped snapshot, next to added plain rows
+            parts = [frame[column].astype('category') for frame in frames]
+            combined[column] = pd.Series(union_categoricals(parts), index=combined.index)
+    return combined
+
+def _segments(lengths, rows=None):
+    """Locate row positions in segments of the given lengths stacked in order
+
+    Yields (segment number, positions within it, positions in the output)
+    for every segment holding any of rows. Without rows every segment is
+    taken whole, with None for the positions within it.
+    """
+    start = 0
+    for i, length in enumerate(lengths):
+        if rows is None:
+            yield i, None, slice(start, start + length)
+        else:
+            inside = np.flatnonzero((rows >= start) & (rows < start + length))
+            if len(inside):
+                yield i, rows[inside] - start, inside
+        start += length
+
+def _widen(counts, width):
+    """View of a CSR matrix with extra empty columns up to width"""
+    return csr_matrix((counts.data, counts.indices, counts.indptr),
+                      shape=(counts.shape[0], width))
+
+
+class TfidfEngine:
+    """Cosine similarity between TF-IDF vectors of the concatenated field text
+
+    Raw term counts are kept in segments, one per batch of added rows, next
+    to per-term document frequencies. The IDF weights and row norms are
+    applied when scoring, so adding or removing rows never copies the
+    counts: it updates the frequencies and recomputes the IDF and the norms
+    in one pass. The weighting matches scikit-learn's TfidfVectorizer
+    (smoothed IDF, L2 norm).
+    """
+
+    name = 'tfidf'
+
+    def __init__(self):
+        self.vectorizer = None  # tokenizer and initial vocabulary
+        self.vocabulary = None
+        self.segments = None    # term counts, one CSR matrix per segment
+        self.doc_freq = None
+        self.n_docs = 0
+        self.idf = None
+        self.norms = None       # L2 norms of the weighted rows, per segment
+
+    def config(self):
+        return (self.name,)
+
+    def fit(self, df):
+        features = prepare_profile_features(df)
+        self.vectorizer = CountVectorizer(stop_words='english')
+        counts = self.vectorizer.fit_transform(features).tocsr()
+        _freeze(counts.data)
+        self.segments = [counts]
+        self.vocabulary = dict(self.vectorizer.vocabulary_)
+        self.doc_freq = np.bincount(counts.indices, minlength=len(self.vocabulary))
+        self.n_docs = counts.shape[0]
+        self._reweight()
+        return self
+
+    def _reweight(self):
+        self.idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+        squared_idf = self.idf ** 2
+        self.norms = []
+        for counts in self.segments:
+            squared = csr_matrix((counts.data ** 2, counts.indices, counts.indptr),
+                                 shape=counts.shape)
+            norms = np.sqrt(squared @ squared_idf[:counts.shape[1]])
+            # Rows without any known term score 0 whatever they are divided by
+            norms[norms == 0] = 1
+            self.norms.append(_freeze(norms))
+
+    @property
+    def matrix(self):
+        """L2-normalized TF-IDF rows of every scholarship, as one CSR matrix"""
+        width = len(self.idf)
+        return vstack([diags(1 / norms) @ _widen(counts, width) @ diags(self.idf)
+                       for counts, norms in zip(self.segments, self.norms)]).tocsr()
+
+    def _count(self, texts, grow=False):
+        """Term count matrix for texts, adding unseen terms to the vocabulary if grow"""
+        analyzer = self.vectorizer.build_analyzer()
+        rows, columns = [], []
+        for i, text in enumerate(texts):
+            for term in analyzer(text):
+                column = self.vocabulary.get(term)
+                if column is None:
+                    if not grow:
+                        continue
+                    column = self.vocabulary[term] = len(self.vocabulary)
+                rows.append(i)
+                columns.append(column)
+        counts = csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, columns)),
+                            shape=(len(texts), len(self.vocabulary)))
+        counts.sum_duplicates()
+        return counts
+
+    def transform(self, profiles):
+        """Sparse matrix with one normalized row per profile"""
+        counts = self._count([profile_text(profile) for profile in profiles])
+        return normalize(counts @ diags(self.idf)).tocsr()
+
+    def score(self, profile_matrix, rows=None):
+        """Dense (profiles x scholarships) similarity scores, optionally for some rows only"""
+        # Profile rows carry the IDF once; a second factor weights the raw counts
+        query = (profile_matrix @ diags(self.idf)).tocsr()
+        lengths = [counts.shape[0] for counts in self.segments]
+        scores = np.empty((query.shape[0], sum(lengths) if rows is None else len(rows)))
+        for i, local, out in _segments(lengths, rows):
+            counts, norms = self.segments[i], self.norms[i]
+            if local is not None:
+                counts, norms = counts[local], norms[local]
+            scores[:, out] = (query[:, :counts.shape[1]] @ counts.T).toarray() / norms
+        return scores
+
+    def add(self, df):
+        """Copy of the engine with a segment of rows for new scholarships"""
+        engine = copy.copy(self)
+        engine.vocabulary = dict(self.vocabulary)
+        counts = engine._count(prepare_profile_features(df), grow=True)
+        _freeze(counts.data)
+        engine.segments = self.segments + [counts]
+        if len(engine.segments) > MAX_SEGMENTS + 1:
+            # Merge the added segments, leaving the (large) first one alone
+            width = len(engine.vocabulary)
+            added = vstack([_widen(c, width) for c in engine.segments[1:]]).tocsr()
+            _freeze(added.data)
+            engine.segments = [engine.segments[0], added]
+        doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+        doc_freq[:len(self.doc_freq)] += self.doc_freq
+        engine.doc_freq = doc_freq
+        engine.n_docs = self.n_docs + counts.shape[0]
+        engine._reweight()
+        return engine
+
+    def remove(self, positions):
+        """Copy of the engine with rows dropped from the document frequencies
+
+        The rows stay in their segments until compact().
+        """
+        engine = copy.copy(self)
+        doc_freq = self.doc_freq.copy()
+        lengths = [counts.shape[0] for counts in self.segments]
+        for i, local, _ in _segments(lengths, np.asarray(positions)):
+            removed = self.segments[i][local]
+            doc_freq[:removed.shape[1]] -= np.bincount(removed.indices,
+                                                       minlength=removed.shape[1])
+        engine.doc_freq = doc_freq
+        engine.n_docs = self.n_docs - len(positions)
+        engine._reweight()
+        return engine
+
+    def compact(self, keep):
+        """Copy of the engine with its segments merged, keeping the rows at positions keep"""
+        engine = copy.copy(self)
+        width = len(self.vocabulary)
+        counts = vstack([_widen(c, width) for c in self.segments]).tocsr()[keep]
+        _freeze(counts.data)
+        engine.segments = [counts]
+        engine.norms = [_freeze(np.concatenate(self.norms)[keep])]
+        return engine
+
+
+# Relative importance of each field for the one-hot engine
+DEFAULT_FIELD_WEIGHTS = {column: 1 for column in FEATURE_COLUMNS}
+
+class OneHotEngine:
+    """Weighted exact matching of each categorical field on per-field codes
+
+    Every scholarship is stored as one small integer code per field, so
+    multi-word values such as 'Uttar Pradesh' stay a single feature and a
+    row costs a few bytes. A profile scores the weight of every field it
+    matches, where scholarships open to 'All'/'Any' match any value: per
+    field, a lookup table gives the weight each code earns, and a row's
+    score is the sum of its lookups scaled to [0, 1]. Weights may be any
+    non-negative numbers.
+    """
+
+    name = 'onehot'
+
+    def __init__(self, weights=None):
+        self.weights = dict(DEFAULT_FIELD_WEIGHTS, **(weights or {}))
+        self.vocabulary = None
+        self.codes = None
+
+    def config(self):
+        return (self.name, tuple(sorted(self.weights.items())))
+
+    def fit(self, df):
+        self.vocabulary = {}
+        self.codes = _freeze(self._encode(df))
+        return self
+
+    def _encode(self, df):
+        """(rows x fields) codes for df, giving unseen field values new codes"""
+        codes = []
+        for column in FEATURE_COLUMNS:
+            values = df[column].astype(str)
+            vocabulary = self.vocabulary.setdefault(column, {})
+            for value in sorted(values.unique()):
+                if value not in vocabulary:
+                    vocabulary[value] = len(vocabulary)
+            codes.append(values.map(vocabulary).to_numpy())
+        size = max(len(vocabulary) for vocabulary in self.vocabulary.values())
+        # Column-major, so each field's codes are contiguous for the lookups
+        return np.asfortranarray(np.column_stack(codes), dtype=np.min_scalar_type(size))
+
+    def transform(self, profiles):
+        """Per field, the weight each of its codes earns for every profile"""
+        tables = [np.zeros((len(profiles), len(self.vocabulary[column])))
+                  for column in FEATURE_COLUMNS]
+        totals = np.zeros(len(profiles))
+        for i, profile in enumerate(profiles):
+            for table, column, key in zip(tables, FEATURE_COLUMNS, PROFILE_KEYS):
+                value = profile.get(key)
+                if value is None or value == '':
+                    continue
+                weight = self.weights[column]
+                vocabulary = self.vocabulary[column]
+                totals[i] += weight
+                if str(value) in vocabulary:
+                    table[i, vocabulary[str(value)]] = weight
+                wildcard = WILDCARDS.get(column)
+                if wildcard in vocabulary:
+                    table[i, vocabulary[wildcard]] = weight
+        return tables, totals
+
+    def score(self, profile_matrix, rows=None):
+        """Dense (profiles x scholarships) match scores in [0, 1], optionally for some rows only"""
+        tables, totals = profile_matrix
+        codes = self.codes if rows is None else self.codes[rows]
+        matches = tables[0][:, codes[:, 0]]
+        for field in range(1, len(tables)):
+            matches += tables[field][:, codes[:, field]]
+        return matches / np.where(totals > 0, totals, 1)[:, None]
+
+    def add(self, df):
+        """Copy of the engine with rows for new scholarships appended"""
+        engine = copy.copy(self)
+        engine.vocabulary = {column: dict(vocabulary)
+                             for column, vocabulary in self.vocabulary.items()}
+        codes = engine._encode(df)
+        engine.codes = _freeze(np.asfortranarray(np.concatenate([self.codes, codes])))
+        return engine
+
+    def remove(self, positions):
+        """The engine itself: scores of the other rows do not depend on removed ones"""
+        return self
+
+    def compact(self, keep):
+        """Copy of the engine keeping only the rows at positions keep"""
+        engine = copy.copy(self)
+        engine.codes = _freeze(np.asfortranarray(self.codes[keep]))
+        return engine
+
+    @staticmethod
+    def split(profile_matrix, block_size):
+        tables, totals = profile_matrix
+        return [([table[start:start + block_size] for table in tables],
+                 totals[start:start + block_size])
+                for start in range(0, len(totals), block_size)]
+
+
+# Recommender engines selectable by name
+ENGINES = {
+    'tfidf': TfidfEngine,
+    'onehot': OneHotEngine,
+}
+
+def _make_engine(engine):
+    return ENGINES[engine]() if isinstance(engine, str) else engine
+
+
+class RecommendationModel:
+    """Recommender engine fitted once per dataset
+
+    Queries only transform the student profile and score it against the
+    engine's cached scholarship matrix. The fitted state can be persisted
+    with save() and reused by load() as long as the dataset fingerprint
+    and engine configuration still match.
+
+    A fitted model is never modified, so one instance can serve many
+    threads; the caller's DataFrame is only ever read. add() and remove()
+    return an updated model that shares the unchanged state, to be swapped
+    in by the caller. Added rows are kept in frames of their own (and in
+    segments of the engine), so an insert never copies df or the engine's
+    rows. Removed rows are tombstoned and skipped
+    when ranking. compact() merges the segments and drops removed rows,
+    which happens automatically once they make up COMPACT_RATIO of the rows.
+    """
+
+    def __init__(self, df, fingerprint=None, engine='tfidf'):
+        self.df = df
+        # Frames of added rows, each continuing the index labels of the last
+        self.added = []
+        self.fingerprint = fingerprint or dataset_fingerprint(df)
+        self.engine = _make_engine(engine)
+
+        # Tie-break keys for top-k selection
+        self.amounts = df['Amount'].to_numpy()
+        self.ids = df['Scholarship_ID'].astype(str).to_numpy()
+        self._result_columns = [df.columns.get_loc(c) for c in RESULT_COLUMNS[:-1]]
+        # Profile batches arrive as text; map them onto the column's own values
+        self._batches = {str(value): value for value in df['Batch'].unique()}
+        # Tombstones of removed rows, None while there are none
+        self.dead = None
+        # Set once compacted, so indexes over the original df no longer apply
+        self.moved = False
+        # Optional approximate nearest-neighbour index, see build_ann_index
+        self.ann = None
+
+    def fit(self):
+        """Fit the engine on the dataset"""
+        self.engine.fit(self.df)
+        return self
+
+    def rebind(self, df):
+        """Copy of this model serving rows from df, which must hold the same data"""
+        model = RecommendationModel(df, self.fingerprint, self.engine)
+        model.ann = self.ann
+        return model
+
+    @property
+    def frames(self):
+        """df followed by the frames of added rows; positions run across them in order"""
+        return [self.df] + self.added
+
+    def _rows(self, positions, columns):
+        """Rows at positions across the frames, restricted to some column positions"""
+        if not self.added:
+            return self.df.iloc[positions, columns]
+        frames = self.frames
+        parts, order = [], []
+        for i, local, out in _segments([len(frame) for frame in frames],
+                                       np.asarray(positions)):
+            parts.append(frames[i].iloc[local, columns])
+            order.append(out)
+        if not parts:
+            return self.df.iloc[[], columns]
+        # The parts come segment by segment; put the rows back in the asked order
+        return _concat_frames(parts).iloc[np.argsort(np.concatenate(order))]
+
+    def labels(self, positions):
+        """Index labels of the rows at positions"""
+        return self._rows(positions, []).index
+
+    def _edited(self, change, **state):
+        """Copy of the model with some of its state replaced"""
+        model = copy.copy(self)
+        model.__dict__.update(state)
+        model.fingerprint = hashlib.sha1((self.fingerprint + change).encode('utf-8')).hexdigest()
+        # New rows are missing from the lists, and compaction moves positions
+        model.ann = None
+        return model
+
+    def add(self, rows):
+        """Model with new scholarships added, given as a frame with the dataset's columns"""
+        if len(rows) == 0:
+            return self
+        new = apply_schema(rows[self.df.columns])
+        last = self.frames[-1]
+        start = last.index.max() + 1 if len(last) else len(self.ids)
+        new.index = pd.RangeIndex(start, start + len(new))
+        added = self.added + [new]
+        if len(added) > MAX_SEGMENTS:
+            added = [_concat_frames(added)]
+        new_ids = new['Scholarship_ID'].astype(str).to_numpy()
+        dead = self.dead
+        if dead is not None:
+            dead = np.concatenate([dead, np.zeros(len(new), dtype=bool)])
+        batches = dict(self._batches)
+        batches.update({str(value): value for value in new['Batch'].unique()})
+        return self._edited('+' + ','.join(new_ids), added=added, engine=self.engine.add(new),
+                            amounts=np.concatenate([self.amounts, new['Amount'].to_numpy()]),
+                            ids=np.concatenate([self.ids, new_ids]),
+                            dead=dead, _batches=batches)
+
+    def remove(self, ids):
+        """Model with scholarships removed by Scholarship_ID"""
+        ids = [str(i) for i in ids]
+        positions = np.flatnonzero(np.isin(self.ids, ids))
+        if self.dead is not None:
+            positions = positions[~self.dead[positions]]
+        if len(positions) == 0:
+            return self
+        dead = np.zeros(len(self.ids), dtype=bool) if self.dead is None else self.dead.copy()
+        dead[positions] = True
+        model = self._edited('-' + ','.join(ids), dead=dead,
+                             engine=self.engine.remove(positions))
+        if dead.mean() >= COMPACT_RATIO:
+            model = model.compact()
+        return model
+
+    def compact(self):
+        """Model with its segments merged and removed rows dropped, renumbering the positions"""
+        if self.dead is None and not self.added:
+            return self
+        keep = np.arange(len(self.ids)) if self.dead is None else np.flatnonzero(~self.dead)
+        df = _concat_frames(self.frames) if self.added else self.df
+        return self._edited('compact', df=df.iloc[keep], added=[],
+                            engine=self.engine.compact(keep),
+                            amounts=self.amounts[keep], ids=self.ids[keep],
+                            dead=None, moved=True)
+
+    def with_ann(self, index):
+        """Copy of the model searching through an ANN index, or exactly for None"""
+        model = copy.copy(self)
+        model.ann = index
+        return model
+
+    def build_ann_index(self, **params):
+        """Copy of the model with an IVF approximate nearest-neighbour index
+
+        TF-IDF engine only. Parameters are passed to ann_index.IVFIndex;
+        n_probe trades latency for recall. Catalogues below min_rows keep
+        using exact search.
+        """
+        if not isinstance(self.engine, TfidfEngine):
+            raise ValueError("The ANN index needs the vectors of the 'tfidf' engine")
+        return self.with_ann(IVFIndex(**params).build(self.engine.matrix))
+
+    def save(self, path):
+        """Persist the fitted engine to disk"""
+        state = {
+            'format': MODEL_FORMAT,
+            'fingerprint': self.fingerprint,
+            'engine': self.engine,
+        }
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, df, fingerprint=None, engine='tfidf'):
+        """Load a persisted model for df, or None if it was fitted on other data"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        saved = state.get('engine')
+        if state.get('format') != MODEL_FORMAT or saved.config() != _make_engine(engine).config():
+            return None
+        model = cls(df, fingerprint, saved)
+        if state['fingerprint'] != model.fingerprint:
+            return None
+        return model
+
+    def scores(self, student_profile):
+        """Similarity of a student profile to every scholarship"""
+        return self.engine.score(self.engine.transform([student_profile]))[0]
+
+    def results(self, top_indices, scores):
+        """Recommendation frame for the given row positions and their scores"""
+        recommended_scholarships = self._rows(top_indices, self._result_columns)
+        return recommended_scholarships.assign(similarity_score=scores)
+
+    def top_n_batch(self, profiles, top_n=10, block_size=1024, workers=None):
+        """Top_n row positions and scores for many student profiles at once
+
+        All profiles are vectorized into one sparse matrix, which is
+        multiplied against the scholarship matrix block_size profiles at a
+        time to bound memory. With workers > 1 the blocks are scored in a
+        process pool.
+
+        Returns (indices, scores), both of shape (len(profiles), k) where k
+        is top_n capped at the number of scholarships not removed.
+        """
+        live = len(self.ids) if self.dead is None else int(np.count_nonzero(~self.dead))
+        k = min(top_n, live)
+        if not profiles:
+            return np.empty((0, k), dtype=np.int64), np.empty((0, k))
+
+        profile_matrix = self.engine.transform(profiles)
+        if hasattr(self.engine, 'split'):
+            blocks = self.engine.split(profile_matrix, block_size)
+        else:
+            blocks = [profile_matrix[start:start + block_size]
+                      for start in range(0, profile_matrix.shape[0], block_size)]
+
+        if workers and workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_init_batch_worker,
+                                     initargs=(self.engine, self.amounts, self.ids,
+                                               self.dead)) as pool:
+                parts = list(pool.map(_score_block_in_worker, blocks, [k] * len(blocks)))
+        else:
+            parts = [_top_k_block(self.engine.score(block), k,
+                                  self.amounts, self.ids, self.dead) for block in blocks]
+
+        return (np.concatenate([indices for indices, _ in parts]),
+                np.concatenate([scores for _, scores in parts]))
+
+    def recommend_batch(self, profiles, top_n=10, block_size=1024, workers=None):
+        """Recommendation frames for many student profiles, in order"""
+        indices, scores = self.top_n_batch(profiles, top_n, block_size, workers)
+        # Gather every profile's rows in one take, then slice per profile
+        combined = self.results(indices.ravel(), scores.ravel())
+        k = indices.shape[1]
+        return [combined.iloc[i * k:(i + 1) * k] for i in range(len(indices))]
+
+    def eligible_rows(self, student_profile, index=None):
+        """Positions of the scholarships a student is not hard-ineligible for
+
+        Gender, caste, course and batch must match (or be open to all), the
+        deadline must not have passed, and when the profile carries a
+        'percentage' the scholarship's minimum must not exceed it.
+        """
+        batch = student_profile.get('batch')
+        plan = compile_eligibility(
+            caste=student_profile.get('caste'),
+            gender=student_profile.get('gender'),
+            course=student_profile.get('course'),
+            batch=self._batches.get(str(batch), batch) if batch else None,
+            percentage=student_profile.get('percentage'),
+        )
+        if self.moved:
+            index = None  # built over the rows before they were compacted
+        rows = select_rows(self.df, plan, index)
+        start = len(self.df)
+        for frame in self.added:
+            rows = np.concatenate([rows, select_rows(frame, plan) + start])
+            start += len(frame)
+        if self.dead is not None:
+            rows = rows[~self.dead[rows]]
+        return rows
+
+    def recommend(self, student_profile, top_n=10, eligible_only=False, index=None):
+        """Top_n scholarships for a student profile
+
+        With eligible_only, candidates are first narrowed to eligible_rows
+        (using index when given) and only those are scored. Otherwise an ANN
+        index built with build_ann_index narrows them to its closest lists.
+        """
+        profile_matrix = self.engine.transform([student_profile])
+        if eligible_only:
+            rows = self.eligible_rows(student_profile, index)
+        elif self.ann is not None:
+            # None when the catalogue is small enough for exact search
+            rows = self.ann.candidates(profile_matrix)
+        else:
+            rows = None
+
+        if rows is None:
+            similarities = self.engine.score(profile_matrix)[0]
+            if self.dead is not None:
+                similarities[self.dead] = -np.inf
+            top_indices = top_k(similarities, top_n, self.amounts, self.ids)
+            top_indices = top_indices[np.isfinite(similarities[top_indices])]
+            return self.results(top_indices, similarities[top_indices])
+
+        if self.dead is not None:
+            rows = rows[~self.dead[rows]]
+        similarities = self.engine.score(profile_matrix, rows)[0]
+        best = top_k(similarities, top_n, self.amounts[rows], self.ids[rows])
+        return self.results(rows[best], similarities[best])
+
+
+# Models fitted in this process, keyed by dataset fingerprint
+_models = {}
+# Fingerprints of the frames get_model has seen, by id(): (weak reference, fingerprint)
+_frame_fingerprints = {}
+# Serializes fitting, so concurrent first requests fit a dataset only once
+_models_lock = threading.Lock()
+
+def _fingerprint_of(df):
+    """dataset_fingerprint of df, hashed only the first time the frame is seen"""
+    known = _frame_fingerprints.get(id(df))
+    if known is not None and known[0]() is df:
+        return known[1]
+    fingerprint = dataset_fingerprint(df)
+    key = id(df)
+    _frame_fingerprints[key] = (weakref.ref(df, lambda _: _frame_fingerprints.pop(key, None)),
+                                fingerprint)
+    return fingerprint
+
+def get_model(df, cache_path=None, engine='tfidf', frozen=False):
+    """Fitted model for df, reusing this process's models and the on-disk cache
+
+    engine is 'tfidf', 'onehot' or an engine instance such as
+    OneHotEngine(weights={...}). df is hashed on every call, so a frame
+    edited in place gets a model of its new content. frozen=True promises
+    the frame is never modified and recognises it by identity instead,
+    skipping the pass over its rows on repeated calls.
+    """
+    config = _make_engine(engine).config()
+    with _models_lock:
+        fingerprint = _fingerprint_of(df) if frozen else dataset_fingerprint(df)
+        key = (fingerprint, config)
+        model = _models.get(key)
+        if model is not None:
+            if model.df is not df:
+                # Same data in another frame: share the fitted state
+                model = _models[key] = model.rebind(df)
+            return model
+
+        if cache_path is not None:
+            model = RecommendationModel.load(cache_path, df, fingerprint, engine)
+        if model is None:
+            model = RecommendationModel(df, fingerprint, engine).fit()
+            if cache_path is not None:
+                model.save(cache_path)
+        # Only the current dataset is worth keeping
+        for stale in [k for k in _models if k[0] != fingerprint]:
+            del _models[stale]
+        _models[key] = model
+        return model
+
+
+def get_personalized_recommendations(df, student_profile, top_n=10, model=None,
+                                     eligible_only=False, index=None):
     """
     Generate personalized scholarship recommendations based on student profile
-    
+
     Parameters:
     -----------
     df : DataFrame
@@ -33,46 +738,47 @@ def get_personalized_recommendations(df, student_profile, top_n=10):
         Dictionary containing student details like state, course, etc.
     top_n : int
         Number of recommendations to return
-        
+    model : RecommendationModel, optional
+        Model fitted on df; looked up (or fitted once) when not given
+    eligible_only : bool
+        Rank only scholarships the student is eligible for; a 'percentage'
+        key in the profile is used as a hard constraint
+    index : ScholarshipIndex, optional
+        Index over df used to find the eligible candidates
+
     Returns:
     --------
     DataFrame with top_n recommended scholarships
     """
-    # Prepare dataframe
-    df = prepare_profile_features(df)
-    
-    # Create student profile text
-    profile_text = (
-        student_profile.get('state', '') + ' ' +
-        student_profile.get('category', '') + ' ' +
-        student_profile.get('caste', '') + ' ' +
-        student_profile.get('gender', '') + ' ' +
-        student_profile.get('course', '') + ' ' +
-        student_profile.get('batch', '')
-    )
-    
-    # Create a corpus with scholarship features and student profile
-    corpus = df['features'].tolist()
-    corpus.append(profile_text)  # Add student profile as the last item
-    
-    # Create TF-IDF vectors
-    vectorizer = TfidfVectorizer(stop_words='english')
-    tfidf_matrix = vectorizer.fit_transform(corpus)
-    
-    # Calculate cosine similarity between student profile and all scholarships
-    student_vector = tfidf_matrix[-1]  # Last item is the student profile
-    scholarship_vectors = tfidf_matrix[:-1]  # All except the last are scholarships
-    
-    # Calculate similarities
-    similarities = cosine_similarity(student_vector, scholarship_vectors)
-    similarities = similarities[0]  # Convert to 1D array
-    
-    # Get indices of top N similar scholarships
-    top_indices = similarities.argsort()[-top_n:][::-1]
-    
-    # Return top N scholarships
-    recommended_scholarships = df.iloc[top_indices].copy()
-    recommended_scholarships['similarity_score'] = similarities[top_indices]
-    
-    return recommended_scholarships[['Scholarship_ID', 'Scholarship_Name', 'Amount', 
-                                   'State', 'Category', 'similarity_score']]
+    if model is None:
+        model = get_model(df)
+    return model.recommend(student_profile, top_n, eligible_only, index)
+
+
+def get_recommendations_batch(df, profiles, top_n=10, block_size=1024,
+                              workers=None, model=None):
+    """
+    Generate recommendations for many student profiles in one pass
+
+    Parameters:
+    -----------
+    df : DataFrame
+        The scholarship dataset
+    profiles : list of dict
+        Student profiles, as for get_personalized_recommendations
+    top_n : int
+        Number of recommendations per student
+    block_size : int
+        Profiles scored per matrix multiplication; bounds peak memory
+    workers : int, optional
+        Score the blocks in a process pool with this many workers
+    model : RecommendationModel, optional
+        Model fitted on df; looked up (or fitted once) when not given
+
+    Returns:
+    --------
+    List of DataFrames with the top_n scholarships for each profile
+    """
+    if model is None:
+        model = get_model(df)
+    return model.recommend_batch(profiles, top_n, block_size, workers)
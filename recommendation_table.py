@@ -0,0 +1,149 @@
+# recommendation_table.py
+import json
+import threading
+
+import numpy as np
+
+from recommendation import FEATURE_COLUMNS, PROFILE_KEYS
+
+class RecommendationTable:
+    """Top-N scholarships precomputed for every distinct student profile
+
+    A profile is six small enumerations (state, category, caste, gender,
+    course and batch, each possibly missing), so the whole profile space
+    is enumerated offline. Each profile is encoded as a mixed-radix
+    integer which indexes straight into compact arrays of row positions
+    and scores, making online lookups O(1).
+
+    When the dataset changes, every key is marked stale and refresh()
+    recomputes them in bounded steps. Stale keys hit in the meantime are
+    scored live and written back, so the table heals incrementally. Rows
+    are written and read under a lock, so concurrent requests never see
+    a half-written entry.
+    """
+
+    def __init__(self, field_values, top_n=10):
+        # Index 0 of every field is '' (value missing from the profile)
+        self.field_values = [[''] + [v for v in values if v != ''] for values in field_values]
+        self.codes = [{value: code for code, value in enumerate(values)}
+                      for values in self.field_values]
+        self.radix = [len(values) for values in self.field_values]
+        self.n_keys = int(np.prod(self.radix))
+        self.top_n = top_n
+
+        self.indices = np.full((self.n_keys, top_n), -1, dtype=np.int32)
+        self.scores = np.zeros((self.n_keys, top_n), dtype=np.float32)
+        self.stale = np.ones(self.n_keys, dtype=bool)
+        self.fingerprint = None
+        self.model = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_model(cls, model, top_n=10):
+        """Table over the profile values present in the model's dataset"""
+        field_values = [sorted(set().union(*(frame[column].astype(str).unique()
+                                             for frame in model.frames)))
+                        for column in FEATURE_COLUMNS]
+        table = cls(field_values, top_n)
+        table.refresh(model)
+        return table
+
+    def encode(self, student_profile):
+        """Integer key for a profile, or None if it holds an unknown value"""
+        key = 0
+        for codes, radix, name in zip(self.codes, self.radix, PROFILE_KEYS):
+            code = codes.get(str(student_profile.get(name, '')))
+            if code is None:
+                return None
+            key = key * radix + code
+        return key
+
+    def decode(self, key):
+        """Profile dict for an integer key"""
+        profile = {}
+        for values, radix, name in zip(reversed(self.field_values), reversed(self.radix),
+                                       reversed(PROFILE_KEYS)):
+            key, code = divmod(key, radix)
+            if code:
+                profile[name] = values[code]
+        return profile
+
+    def invalidate(self, model):
+        """Point the table at a refitted or edited model, marking every key stale"""
+        with self._lock:
+            if model.fingerprint != self.fingerprint:
+                self.stale[:] = True
+                self.fingerprint = model.fingerprint
+            self.model = model
+
+    def refresh(self, model, max_keys=None, block_size=4096):
+        """Recompute up to max_keys stale keys (all by default)
+
+        Returns the number of keys still stale afterwards.
+        """
+        self.invalidate(model)
+        keys = np.flatnonzero(self.stale)[:max_keys]
+        for start in range(0, len(keys), block_size):
+            block = keys[start:start + block_size]
+            indices, scores = model.top_n_batch([self.decode(key) for key in block],
+                                                self.top_n, block_size)
+            self._store(model, block, indices, scores)
+        return int(self.stale.sum())
+
+    def _store(self, model, keys, indices, scores):
+        """Write computed entries, unless the table has moved on from model meanwhile"""
+        # Fewer rows than top_n may be left, e.g. after removals
+        rows = np.full((len(keys), self.top_n), -1, dtype=self.indices.dtype)
+        rows[:, :indices.shape[1]] = indices
+        row_scores = np.zeros((len(keys), self.top_n), dtype=self.scores.dtype)
+        row_scores[:, :scores.shape[1]] = scores
+        with self._lock:
+            if self.model is model:
+                self.indices[keys] = rows
+                self.scores[keys] = row_scores
+                self.stale[keys] = False
+
+    def lookup(self, student_profile, model=None):
+        """(row positions, scores) of the top_n scholarships for a profile
+
+        Positions refer to model, the table's current model by default;
+        entries computed for another model are never served for it.
+        """
+        model = model or self.model
+        key = self.encode(student_profile)
+        if key is not None:
+            with self._lock:
+                if self.model is model and not self.stale[key]:
+                    indices, scores = self.indices[key].copy(), self.scores[key].copy()
+                    valid = indices >= 0
+                    return indices[valid], scores[valid]
+        indices, scores = model.top_n_batch([student_profile], self.top_n)
+        if key is not None:
+            self._store(model, [key], indices, scores)
+        return indices[0], scores[0]
+
+    def recommend(self, student_profile, top_n=10, model=None):
+        """Recommendation frame for a profile, served from the table"""
+        model = model or self.model
+        indices, scores = self.lookup(student_profile, model)
+        return model.results(indices[:top_n], scores[:top_n].astype(np.float64))
+
+    def save(self, path):
+        """Persist the table to a compressed .npz file"""
+        np.savez_compressed(path, indices=self.indices, scores=self.scores,
+                            stale=self.stale,
+                            fingerprint=np.array(self.fingerprint or ''),
+                            field_values=np.array(json.dumps(self.field_values)))
+
+    @classmethod
+    def load(cls, path, model):
+        """Load a persisted table; keys go stale if the model's dataset has changed"""
+        data = np.load(path)
+        field_values = json.loads(str(data['field_values']))
+        table = cls(field_values, data['indices'].shape[1])
+        table.indices = data['indices']
+        table.scores = data['scores']
+        table.stale = data['stale']
+        table.fingerprint = str(data['fingerprint']) or None
+        table.invalidate(model)
+        return table
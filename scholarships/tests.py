@@ -0,0 +1,52 @@
+import json
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+
+class ChartDataViewTests(SimpleTestCase):
+    """The chart data endpoint, which reads the CSV dataset and never the database"""
+
+    def get(self, chart, params=None, **headers):
+        return self.client.get(reverse('chart_data', args=[chart]), params or {}, **headers)
+
+    def test_chart_data_with_etag(self):
+        response = self.get('scholarships_by_state', {'states': ['Delhi', 'Goa'], 'batches': ['2024']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertTrue(response['ETag'])
+        data = json.loads(response.content)
+        self.assertLessEqual(set(data['labels']), {'Delhi', 'Goa'})
+        self.assertEqual(len(data['labels']), len(data['counts']))
+
+    def test_every_chart(self):
+        for chart in ('scholarships_by_state', 'scholarship_amounts', 'amounts_by_category',
+                      'eligibility_breakdown', 'batch_course_heatmap'):
+            with self.subTest(chart=chart):
+                response = self.get(chart, {'min_amount': '10000'})
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(json.loads(response.content))
+
+    def test_matching_etag_not_modified(self):
+        params = {'states': ['Delhi'], 'max_amount': '50000'}
+        etag = self.get('scholarship_amounts', params)['ETag']
+        response = self.get('scholarship_amounts', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_other_filters_other_etag(self):
+        etag = self.get('scholarship_amounts', {'states': ['Delhi']})['ETag']
+        response = self.get('scholarship_amounts', {'states': ['Goa']}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unknown_chart(self):
+        self.assertEqual(self.get('no_such_chart').status_code, 404)
+
+    def test_bad_integer_parameter(self):
+        for name in ('min_amount', 'max_amount', 'batches', 'closing_within_days'):
+            with self.subTest(name=name):
+                response = self.get('scholarships_by_state', {name: 'abc'})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.content.decode(), f"Parameter '{name}' must be an integer")
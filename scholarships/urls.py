@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import ScholarshipListView
+from .views import ChartDataView, ScholarshipListView
 
 urlpatterns = [
     path('scholarships/', ScholarshipListView.as_view(), 
          name='scholarship_list'),
+    path('scholarships/charts/<str:chart>.json', ChartDataView.as_view(),
+         name='chart_data'),
 ]
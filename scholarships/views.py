@@ -1,3 +1,10 @@
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import condition
 from django.views.generic import ListView
 from django.core.paginator import Paginator
 from .models import Scholarship
@@ -23,3 +30,87 @@ class ScholarshipListView(ListView):
         page_number = self.request.GET.get('page')
         context['page_obj'] = paginator.get_page(page_number)
         return context
+
+
+# --- Chart data API -----------------------------------------------------
+# One ScholarshipFilterSystem (and so one dataset snapshot, query cache and
+# aggregate cube) is shared by every request; it is loaded on first use,
+# without a recommender or any file cache, since charts need neither.
+
+_filter_system = None
+_filter_system_lock = threading.Lock()
+
+def get_filter_system():
+    global _filter_system
+    with _filter_system_lock:
+        if _filter_system is None:
+            from app import ScholarshipFilterSystem
+            _filter_system = ScholarshipFilterSystem(str(settings.SCHOLARSHIP_DATASET),
+                                                     recommender=None)
+        return _filter_system
+
+class BadParameter(ValueError):
+    """A query string parameter that does not hold what the view expects"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.name = name
+
+def _integers(params, name):
+    try:
+        return [int(value) for value in params.getlist(name)]
+    except ValueError:
+        raise BadParameter(name) from None
+
+def chart_filters(params):
+    """filter_functions.compile_filters arguments from the query string
+
+    Raises BadParameter for a parameter that should be an integer and isn't.
+    """
+    filters = {'min_amount': _integers(params, 'min_amount')[-1] if 'min_amount' in params else 0,
+               # Unlike compile_filters, no percentage means no constraint
+               'min_percentage': None}
+    for name in ('states', 'castes', 'categories', 'courses'):
+        if name in params:
+            filters[name] = params.getlist(name)
+    if 'batches' in params:
+        filters['batches'] = _integers(params, 'batches')
+    if 'gender' in params:
+        filters['gender'] = params['gender']
+    for name in ('max_amount', 'min_percentage', 'closing_within_days'):
+        if name in params:
+            filters[name] = _integers(params, name)[-1]
+    filters['active_only'] = params.get('active_only') in ('1', 'true')
+    return filters
+
+def _chart_results(request, chart):
+    from chart_data import CHART_DATA
+    if chart not in CHART_DATA:
+        raise Http404(f"Unknown chart: {chart}")
+    return get_filter_system().query(**chart_filters(request.GET))
+
+def _chart_etag(request, chart):
+    from chart_data import chart_etag
+    try:
+        return chart_etag(chart, _chart_results(request, chart))
+    except BadParameter:
+        return None
+
+@method_decorator(condition(etag_func=_chart_etag), name='get')
+class ChartDataView(View):
+    """Aggregated data of one dashboard chart as JSON, for client-side rendering
+
+    Responses carry an ETag derived from the chart, the filters and the
+    dataset content, so browsers revalidate a cached chart with a 304
+    that costs no aggregation at all.
+    """
+
+    def get(self, request, chart):
+        try:
+            results = _chart_results(request, chart)
+        except BadParameter as e:
+            return HttpResponseBadRequest(f"Parameter '{e.name}' must be an integer")
+        response = HttpResponse(get_filter_system().chart_data(chart, results),
+                                content_type='application/json')
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,98 @@
+# snapshot.py
+import json
+import numpy as np
+import pandas as pd
+
+from filter_functions import load_dataset
+
+# File layout:
+#   MAGIC | uint64 header length | JSON header | column arrays
+# Every column array is fixed width and starts on an ALIGNMENT boundary.
+# Text and categorical columns are stored as integer codes into a string
+# dictionary kept in the header, and both come back as categoricals.
+MAGIC = b'SCHSNAP1'
+ALIGNMENT = 64
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _encode(series):
+    """Fixed-width array plus header metadata for one column"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        codes = series.cat.codes.to_numpy()
+    elif series.dtype.kind in 'biufcmM':
+        return series.to_numpy(), {}
+    else:
+        codes, categories = pd.factorize(series, use_na_sentinel=True)
+
+    code_dtype = np.min_scalar_type(-len(categories))
+    meta = {
+        'categories': categories.tolist(),
+        'categories_dtype': str(categories.dtype),
+    }
+    return codes.astype(code_dtype), meta
+
+def write_snapshot(df, path):
+    """Write df as a snapshot file that workers can memory-map"""
+    columns = []
+    arrays = []
+    for name in df.columns:
+        array, meta = _encode(df[name])
+        array = np.ascontiguousarray(array)
+        columns.append(dict(meta, name=name, dtype=array.dtype.str))
+        arrays.append(array)
+
+    # Offsets are relative to the data section, which starts aligned
+    offset = 0
+    for column, array in zip(columns, arrays):
+        offset = _align(offset)
+        column['offset'] = offset
+        offset += array.nbytes
+    header = json.dumps({'n_rows': len(df), 'columns': columns}).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for column, array in zip(columns, arrays):
+            f.seek(data_start + column['offset'])
+            f.write(array.tobytes())
+
+def open_snapshot(path):
+    """Memory-map a snapshot file and wrap its columns zero-copy as a DataFrame
+
+    The arrays are read-only views of the file, so every process opening the
+    same snapshot shares one physical copy through the page cache. Text
+    columns such as Scholarship_ID therefore come back as categoricals over
+    their mapped codes rather than as the strings load_dataset gives;
+    decoding them would give every process a private copy.
+    """
+    buffer = np.memmap(path, mode='r')
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a scholarship snapshot")
+    header_length = int(buffer[len(MAGIC):len(MAGIC) + 8].view(np.uint64)[0])
+    header_start = len(MAGIC) + 8
+    header = json.loads(bytes(buffer[header_start:header_start + header_length]))
+    data_start = _align(header_start + header_length)
+
+    n_rows = header['n_rows']
+    data = {}
+    for column in header['columns']:
+        array = np.frombuffer(buffer, dtype=np.dtype(column['dtype']), count=n_rows,
+                              offset=data_start + column['offset'])
+        if 'categories' in column:
+            categories = pd.Index(column['categories'], dtype=column['categories_dtype'])
+            array = pd.Categorical.from_codes(array, dtype=pd.CategoricalDtype(categories))
+        data[column['name']] = array
+    return pd.DataFrame(data, copy=False)
+
+def convert_csv_to_snapshot(csv_path='scholarship_dataset.csv',
+                            snapshot_path='scholarship_dataset.snap'):
+    """Build a snapshot from the typed CSV dataset"""
+    write_snapshot(load_dataset(csv_path), snapshot_path)
+
+if __name__ == "__main__":
+    convert_csv_to_snapshot()
+    print("Snapshot written to 'scholarship_dataset.snap'")
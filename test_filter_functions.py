@@ -0,0 +1,112 @@
+# test_filter_functions.py
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_functions import (apply_all_filters, apply_filters_batch, apply_schema,
+                              compile_filters, load_dataset, select_rows)
+from indexes import ScholarshipIndex
+
+N_QUERIES = 400
+
+@pytest.fixture(scope='module')
+def raw():
+    """The CSV dataset untyped, with deadlines moved around today"""
+    df = load_dataset(typed=False)
+    offsets = np.random.default_rng(0).integers(-30, 30, len(df))
+    today = pd.Timestamp(datetime.now().date())
+    df['Application_Deadline'] = (today + pd.to_timedelta(offsets, 'D')).strftime('%Y-%m-%d')
+    return df
+
+@pytest.fixture(scope='module')
+def typed(raw):
+    return apply_schema(raw)
+
+@pytest.fixture(scope='module')
+def queries(raw):
+    rng = np.random.default_rng(1)
+
+    def some(column, extra=()):
+        values = sorted(raw[column].unique().tolist()) + list(extra)
+        if rng.random() < 0.4:
+            return None
+        return [values[i] for i in rng.choice(len(values), rng.integers(1, 4), replace=False)]
+
+    queries = []
+    for _ in range(N_QUERIES):
+        gender = rng.choice(['Male', 'Female', 'All', None])
+        low = int(rng.choice([0, 10000, 25000]))
+        queries.append({
+            'states': some('State', ['All']),
+            'castes': some('Eligibility_Caste'),
+            'gender': None if gender is None else str(gender),
+            'min_amount': low,
+            'max_amount': int(rng.choice([0, low + 20000, 100000])) or None,
+            'batches': some('Batch'),
+            'categories': some('Category'),
+            'courses': some('Course_Applicable'),
+            'min_percentage': int(rng.choice([0, 60, 80, 100])),
+            'active_only': bool(rng.random() < 0.3),
+            'closing_within_days': int(rng.choice([7, 30])) if rng.random() < 0.2 else None,
+        })
+    return queries
+
+def chained_filters(df, states=None, castes=None, gender=None, min_amount=0,
+                    max_amount=None, batches=None, categories=None, courses=None,
+                    min_percentage=0, active_only=False, closing_within_days=None):
+    """The original filter-by-filter semantics, on the untyped CSV columns"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    if states and 'All' not in states:
+        df = df[df['State'].isin(states)]
+    if castes and 'All' not in castes:
+        df = df[df['Eligibility_Caste'].isin(castes) | (df['Eligibility_Caste'] == 'All')]
+    if gender and gender != 'All':
+        df = df[(df['Eligibility_Gender'] == gender) | (df['Eligibility_Gender'] == 'All')]
+    if max_amount:
+        df = df[(df['Amount'] >= min_amount) & (df['Amount'] <= max_amount)]
+    else:
+        df = df[df['Amount'] >= min_amount]
+    if batches:
+        df = df[df['Batch'].isin(batches)]
+    if categories:
+        df = df[df['Category'].isin(categories)]
+    if courses:
+        df = df[df['Course_Applicable'].isin(courses) | (df['Course_Applicable'] == 'Any')]
+    df = df[df['Min_Percentage_Required'] <= min_percentage]
+    if active_only:
+        df = df[df['Application_Deadline'] >= today]
+    if closing_within_days is not None:
+        last_day = (datetime.now() + timedelta(days=closing_within_days)).strftime('%Y-%m-%d')
+        df = df[(df['Application_Deadline'] >= today) & (df['Application_Deadline'] <= last_day)]
+    return df
+
+def test_compiled_plan_matches_chained_filters(raw, typed, queries):
+    matched = 0
+    for query in queries:
+        expected = chained_filters(raw, **query)['Scholarship_ID'].tolist()
+        assert apply_all_filters(typed, **query)['Scholarship_ID'].tolist() == expected, query
+        matched += bool(expected)
+    # The queries must actually select rows for the comparison to mean anything
+    assert matched > N_QUERIES // 10
+
+def test_index_matches_scan(typed, queries):
+    index = ScholarshipIndex(typed)
+    for query in queries:
+        plan = compile_filters(**query)
+        np.testing.assert_array_equal(select_rows(typed, plan, index),
+                                      select_rows(typed, plan), err_msg=str(query))
+
+def test_batch_matches_single_queries(typed, queries):
+    index = ScholarshipIndex(typed)
+    expected = [select_rows(typed, compile_filters(**query)) for query in queries]
+    for found in (apply_filters_batch(typed, queries),
+                  apply_filters_batch(typed, queries, index=index)):
+        for rows, want in zip(found, expected):
+            np.testing.assert_array_equal(rows, want)
+
+    matrix = apply_filters_batch(typed, queries, as_matrix=True)
+    assert matrix.shape == (len(queries), len(typed))
+    for i, want in enumerate(expected):
+        np.testing.assert_array_equal(matrix[i].indices, want)
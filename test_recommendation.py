@@ -0,0 +1,84 @@
+# test_recommendation.py
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_functions import apply_schema, load_dataset
+from indexes import ScholarshipIndex
+from recommendation import MAX_SEGMENTS, RecommendationModel, _concat_frames
+
+ENGINES = ['tfidf', 'onehot']
+
+PROFILES = [
+    {'state': 'Goa', 'course': 'Law', 'caste': 'SC', 'gender': 'Female', 'batch': '2024'},
+    {'state': 'Delhi', 'course': 'Engineering', 'batch': '2026', 'percentage': 80},
+    {'category': 'Merit-based'},
+    {},
+]
+
+@pytest.fixture(scope='module')
+def split():
+    """The dataset cut into a base frame and new rows, some with values unseen in the base
+
+    Deadlines are moved around today so that eligibility keeps some rows.
+    """
+    df = load_dataset(typed=False)
+    offsets = np.random.default_rng(0).integers(-30, 30, len(df))
+    today = pd.Timestamp(datetime.now().date())
+    df['Application_Deadline'] = (today + pd.to_timedelta(offsets, 'D')).strftime('%Y-%m-%d')
+    base, extra = apply_schema(df.iloc[:900]), df.iloc[900:]
+    extra = extra.assign(State=extra['State'].where(extra.index % 3 > 0, 'Goa'),
+                         Course_Applicable=extra['Course_Applicable'].where(extra.index % 5 > 0, 'Law'))
+    return base, extra
+
+@pytest.fixture(scope='module')
+def removed(split):
+    base, extra = split
+    return list(base['Scholarship_ID'].iloc[[3, 50]]) + list(extra['Scholarship_ID'].iloc[[2, 40]])
+
+def edited_model(split, removed, engine):
+    """Model fitted on the base frame, then grown in small batches and trimmed"""
+    base, extra = split
+    model = RecommendationModel(base, engine=engine).fit()
+    for start in range(0, 105, 7):
+        model = model.add(extra.iloc[start:start + 7])
+    return model.remove(removed)
+
+def fresh_model(split, removed, engine):
+    """Model fitted from scratch on the rows the edited model should hold"""
+    base, extra = split
+    full = _concat_frames([base, apply_schema(extra.iloc[:105])]).reset_index(drop=True)
+    return RecommendationModel(full[~full['Scholarship_ID'].isin(removed)], engine=engine).fit()
+
+def assert_same_recommendations(model, fresh, index=None):
+    for profile in PROFILES:
+        got, want = model.recommend(profile, 15), fresh.recommend(profile, 15)
+        assert got['Scholarship_ID'].tolist() == want['Scholarship_ID'].tolist(), profile
+        np.testing.assert_allclose(got['similarity_score'], want['similarity_score'])
+
+        got = model.recommend(profile, 15, eligible_only=True, index=index)
+        want = fresh.recommend(profile, 15, eligible_only=True)
+        assert got['Scholarship_ID'].tolist() == want['Scholarship_ID'].tolist(), profile
+        assert len(want), profile
+
+    indices, _ = model.top_n_batch(PROFILES, 10)
+    for rows, profile in zip(indices, PROFILES):
+        assert model.ids[rows].tolist() == fresh.recommend(profile, 10)['Scholarship_ID'].tolist()
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_edited_model_matches_fresh_fit(split, removed, engine):
+    model = edited_model(split, removed, engine)
+    assert 0 < len(model.added) <= MAX_SEGMENTS
+    assert model.dead.sum() == len(removed)
+    assert_same_recommendations(model, fresh_model(split, removed, engine),
+                                ScholarshipIndex(split[0]))
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_compacted_model_matches_fresh_fit(split, removed, engine):
+    model = edited_model(split, removed, engine).compact()
+    fresh = fresh_model(split, removed, engine)
+    assert not model.added and model.dead is None
+    assert model.ids.tolist() == fresh.ids.tolist()
+    assert_same_recommendations(model, fresh)
@@ -1,97 +1,233 @@
 # visualizations.py
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import seaborn as sns
-import pandas as pd
 import numpy as np
 
+from aggregate_cube import AggregateCube
+
 def set_styling():
     """Set consistent styling for all visualizations"""
     sns.set_style("whitegrid")
     plt.rcParams['figure.figsize'] = (12, 8)
     plt.rcParams['font.size'] = 12
-    
-def plot_scholarship_distribution_by_state(df):
-    """Plot bar chart of scholarships by state"""
-    set_styling()
-    plt.figure(figsize=(14, 8))
-    
-    state_counts = df['State'].value_counts()
-    sns.barplot(x=state_counts.index, y=state_counts.values, palette='viridis')
-    
-    plt.title('Distribution of Scholarships by State', fontsize=16)
-    plt.xlabel('State', fontsize=14)
-    plt.ylabel('Number of Scholarships', fontsize=14)
-    plt.xticks(rotation=90)
-    plt.tight_layout()
-    plt.savefig('scholarships_by_state.png')
-    plt.show()
 
-def plot_scholarship_amount_distribution(df):
-    """Plot distribution of scholarship amounts"""
-    set_styling()
-    
-    plt.figure(figsize=(12, 6))
-    sns.histplot(df['Amount'], bins=20, kde=True)
-    plt.title('Distribution of Scholarship Amounts', fontsize=16)
-    plt.xlabel('Amount (₹)', fontsize=14)
-    plt.ylabel('Frequency', fontsize=14)
-    plt.tight_layout()
-    plt.savefig('scholarship_amounts.png')
-    plt.show()
-    
-    # Box plot by category
-    plt.figure(figsize=(14, 8))
-    sns.boxplot(x='Category', y='Amount', data=df, palette='Set3')
-    plt.title('Scholarship Amounts by Category', fontsize=16)
-    plt.xlabel('Category', fontsize=14)
-    plt.ylabel('Amount (₹)', fontsize=14)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('amounts_by_category.png')
-    plt.show()
+# --- Chart drawing ------------------------------------------------------
+# Each draw_* function draws one chart onto a given Figure through the
+# object-oriented API, so the same code serves pyplot windows and
+# headless Agg rendering. Most charts are drawn from an AggregateCube
+# rather than from the rows themselves.
+
+def draw_scholarship_distribution_by_state(fig, cube):
+    """Bar chart of scholarships by state"""
+    ax = fig.add_subplot()
+    state_counts = cube.counts('State')
+    sns.barplot(x=state_counts.index.astype(str), y=state_counts.values, palette='viridis', ax=ax)
+
+    ax.set_title('Distribution of Scholarships by State', fontsize=16)
+    ax.set_xlabel('State', fontsize=14)
+    ax.set_ylabel('Number of Scholarships', fontsize=14)
+    ax.tick_params(axis='x', labelrotation=90)
+
+def draw_scholarship_amount_distribution(fig, cube):
+    """Histogram of scholarship amounts with a KDE, from the cube's bins"""
+    ax = fig.add_subplot()
+    distribution = cube.distribution()
+    if distribution.count:
+        # A few dozen bars over the span holding any scholarships
+        bars = distribution.coarsen()
+        color = sns.color_palette()[0]
+        ax.bar(bars.edges[:-1], bars.counts, width=np.diff(bars.edges), align='edge',
+               color=color, edgecolor='white', alpha=0.75)
+        amounts, density = distribution.kde()
+        ax.plot(amounts, density * distribution.count * bars.step, color=color)
+        if distribution.log:
+            ax.set_xscale('log')
+    ax.set_title('Distribution of Scholarship Amounts', fontsize=16)
+    ax.set_xlabel('Amount (₹)', fontsize=14)
+    ax.set_ylabel('Frequency', fontsize=14)
+
+def draw_amounts_by_category(fig, cube):
+    """Box plot of scholarship amounts by category, from the cube's bins"""
+    ax = fig.add_subplot()
+    stats = [distribution.box_stats(str(category))
+             for category, distribution in cube.distributions('Category').items()]
+    boxes = ax.bxp(stats, showfliers=False, patch_artist=True,
+                   medianprops={'color': '0.3'})['boxes']
+    for box, color in zip(boxes, sns.color_palette('Set3', len(boxes))):
+        box.set_facecolor(color)
+    ax.set_title('Scholarship Amounts by Category', fontsize=16)
+    ax.set_xlabel('Category', fontsize=14)
+    ax.set_ylabel('Amount (₹)', fontsize=14)
+    ax.tick_params(axis='x', labelrotation=45)
+
+def draw_eligibility_breakdown(fig, cube):
+    """Pie charts for caste and gender eligibility"""
+    ax1, ax2 = fig.subplots(1, 2)
 
-def plot_eligibility_breakdown(df):
-    """Plot pie charts for caste and gender eligibility"""
-    set_styling()
-    
-    # Create a figure with two subplots
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
-    
     # Caste eligibility pie chart
-    caste_counts = df['Eligibility_Caste'].value_counts()
-    ax1.pie(caste_counts, labels=caste_counts.index, autopct='%1.1f%%', 
+    caste_counts = cube.counts('Eligibility_Caste')
+    ax1.pie(caste_counts, labels=caste_counts.index, autopct='%1.1f%%',
             startangle=90, colors=sns.color_palette('Set3', len(caste_counts)))
     ax1.set_title('Scholarships by Caste Eligibility', fontsize=16)
-    
+
     # Gender eligibility pie chart
-    gender_counts = df['Eligibility_Gender'].value_counts()
-    ax2.pie(gender_counts, labels=gender_counts.index, autopct='%1.1f%%', 
+    gender_counts = cube.counts('Eligibility_Gender')
+    ax2.pie(gender_counts, labels=gender_counts.index, autopct='%1.1f%%',
             startangle=90, colors=sns.color_palette('pastel', len(gender_counts)))
     ax2.set_title('Scholarships by Gender Eligibility', fontsize=16)
-    
-    plt.tight_layout()
-    plt.savefig('eligibility_breakdown.png')
-    plt.show()
 
-def plot_batch_course_heatmap(df):
-    """Plot heatmap of scholarships by batch and course"""
+def draw_batch_course_heatmap(fig, cube):
+    """Heatmap of scholarships by batch and course"""
+    ax = fig.add_subplot()
+    heatmap_data = cube.crosstab('Batch', 'Course_Applicable')
+    sns.heatmap(heatmap_data, annot=True, cmap='YlGnBu', fmt='d', linewidths=.5, ax=ax)
+    ax.set_title('Scholarships Available by Batch and Course', fontsize=16)
+
+# Every chart: file name -> (draw function, figure size, row columns it reads)
+# Charts reading no row columns are drawn from the AggregateCube
+CHARTS = {
+    'scholarships_by_state': (draw_scholarship_distribution_by_state, (14, 8), None),
+    'scholarship_amounts': (draw_scholarship_amount_distribution, (12, 6), None),
+    'amounts_by_category': (draw_amounts_by_category, (14, 8), None),
+    'eligibility_breakdown': (draw_eligibility_breakdown, (16, 8), None),
+    'batch_course_heatmap': (draw_batch_course_heatmap, (14, 10), None),
+}
+
+def _chart_data(name, df, cube):
+    """What a chart's draw function takes: the cube, or the columns it reads"""
+    columns = CHARTS[name][2]
+    return cube if columns is None else df[columns]
+
+def _show_chart(name, df, output_dir='.', cube=None):
+    """Draw a chart in a pyplot window, saving it to output_dir"""
+    draw, figsize, _ = CHARTS[name]
+    if cube is None and CHARTS[name][2] is None:
+        cube = AggregateCube.from_frame(df)
     set_styling()
-    
-    # Create crosstab
-    heatmap_data = pd.crosstab(df['Batch'], df['Course_Applicable'])
-    
-    plt.figure(figsize=(14, 10))
-    sns.heatmap(heatmap_data, annot=True, cmap='YlGnBu', fmt='d', linewidths=.5)
-    plt.title('Scholarships Available by Batch and Course', fontsize=16)
-    plt.tight_layout()
-    plt.savefig('batch_course_heatmap.png')
+    fig = plt.figure(figsize=figsize)
+    draw(fig, _chart_data(name, df, cube))
+    fig.tight_layout()
+    path = os.path.join(output_dir, f'{name}.png')
+    fig.savefig(path)
     plt.show()
+    return path
+
+def _render_figure(name, data):
+    """A chart drawn on an Agg canvas, without pyplot or a display"""
+    draw, figsize, _ = CHARTS[name]
+    with matplotlib.rc_context({'font.size': 12}), sns.axes_style('whitegrid'):
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        draw(fig, data)
+        fig.tight_layout()
+    return fig
+
+def render_chart(name, data, output_dir='visualizations'):
+    """Render a chart to a PNG file without pyplot or a display; returns its path
+
+    data is what the chart's draw function takes (see _chart_data). The
+    figure is drawn by the Agg canvas directly, so this is safe on
+    headless servers and in worker processes.
+    """
+    path = os.path.join(output_dir, f'{name}.png')
+    _render_figure(name, data).savefig(path)
+    return path
+
+def render_chart_png(name, data):
+    """PNG bytes of a chart rendered like render_chart"""
+    buffer = io.BytesIO()
+    _render_figure(name, data).savefig(buffer, format='png')
+    return buffer.getvalue()
+
+def render_view_png(name, view):
+    """PNG bytes of a chart of a dataset_snapshot.ResultView"""
+    columns = CHARTS[name][2]
+    data = view.aggregate() if columns is None else view.frame(columns)
+    return render_chart_png(name, data)
+
+def _render_task(task):
+    return render_chart(*task)
+
+def render_charts(segments, output_dir='visualizations', charts=None, workers=None,
+                  cubes=None):
+    """Render charts for many data segments across a process pool
+
+    segments maps a segment name to its DataFrame; each segment's charts
+    go to its own subdirectory of output_dir (or to output_dir itself for
+    the name None). cubes optionally maps segment names to their
+    precomputed AggregateCube. One chart is rendered per task, and each
+    worker is sent only the cube or the columns its chart reads.
+    workers=1 renders in-process.
+
+    Returns {segment name: [PNG paths]} in chart order; segments without
+    rows get no charts.
+    """
+    charts = list(charts or CHARTS)
+    requested = list(segments)
+    segments = {segment: df for segment, df in segments.items() if len(df)}
+    tasks = []
+    for segment, df in segments.items():
+        directory = output_dir if segment is None else os.path.join(output_dir, str(segment))
+        os.makedirs(directory, exist_ok=True)
+        cube = (cubes or {}).get(segment)
+        if cube is None and any(CHARTS[name][2] is None for name in charts):
+            cube = AggregateCube.from_frame(df)
+        tasks += [(name, _chart_data(name, df, cube), directory) for name in charts]
+
+    if workers == 1 or len(tasks) <= 1:
+        paths = [_render_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(min(workers or os.cpu_count(), len(tasks))) as pool:
+            paths = list(pool.map(_render_task, tasks))
+    results = {segment: [] for segment in requested}
+    for i, segment in enumerate(segments):
+        results[segment] = paths[i * len(charts):(i + 1) * len(charts)]
+    return results
+
+def plot_scholarship_distribution_by_state(df, output_dir='.', cube=None):
+    """Plot bar chart of scholarships by state"""
+    return _show_chart('scholarships_by_state', df, output_dir, cube)
+
+def plot_scholarship_amount_distribution(df, output_dir='.', cube=None):
+    """Plot distribution of scholarship amounts"""
+    return [_show_chart('scholarship_amounts', df, output_dir, cube),
+            # Box plot by category
+            _show_chart('amounts_by_category', df, output_dir, cube)]
+
+def plot_eligibility_breakdown(df, output_dir='.', cube=None):
+    """Plot pie charts for caste and gender eligibility"""
+    return _show_chart('eligibility_breakdown', df, output_dir, cube)
+
+def plot_batch_course_heatmap(df, output_dir='.', cube=None):
+    """Plot heatmap of scholarships by batch and course"""
+    return _show_chart('batch_course_heatmap', df, output_dir, cube)
+
+def generate_all_visualizations(df, output_dir='.', headless=False, workers=None,
+                                cube=None):
+    """Generate all visualizations for dataset
+
+    cube is df's AggregateCube when already at hand. With headless=True
+    the charts are rendered off-screen in a process pool instead of being
+    shown one by one. Returns the saved file paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if cube is None:
+        cube = AggregateCube.from_frame(df)
+    if headless:
+        paths = render_charts({None: df}, output_dir, workers=workers,
+                              cubes={None: cube})[None]
+    else:
+        paths = [plot_scholarship_distribution_by_state(df, output_dir, cube)]
+        paths += plot_scholarship_amount_distribution(df, output_dir, cube)
+        paths += [plot_eligibility_breakdown(df, output_dir, cube),
+                  plot_batch_course_heatmap(df, output_dir, cube)]
 
-def generate_all_visualizations(df):
-    """Generate all visualizations for dataset"""
-    plot_scholarship_distribution_by_state(df)
-    plot_scholarship_amount_distribution(df)
-    plot_eligibility_breakdown(df)
-    plot_batch_course_heatmap(df)
-    
     print("All visualizations have been generated and saved!")
+    return paths